@@ -0,0 +1,47 @@
+"""
+Description: Compares the integration speed of the precompiled drag kernel against the sympy lambdified equations of
+motion. Run from the repository root with: python -m benchmarks.bench_kernels
+"""
+import time
+import numpy as np
+from simulator.kernels import DragKernel
+from simulator.mission import Mission
+from simulator import symbolic
+from tools import toslugs
+
+
+def steps_per_second(step, y, h, n_steps):
+    """
+    Times n_steps integration steps
+    :param step: function taking the state vector and time step and returning the next state vector
+    :param y: initial state vector
+    :param h: time step
+    :param n_steps: number of steps to take
+    :return: steps per second
+    """
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        y = step(y, h)
+    return n_steps / (time.perf_counter() - start)
+
+
+def main(n_steps=20000):
+    mass = toslugs(36.54, 'lb')
+    area = np.pi
+    c_d = 0.75
+    y = np.array([4000.0, 0.0])
+    h = 0.01
+
+    l_equ = symbolic.make_equ(mass, area, c_d)
+    kernel = DragKernel(mass, area, c_d)
+    cases = [("lambdify + rk4", lambda yn, dt: Mission.rk4(yn, l_equ, dt)),
+             ("kernel + rk4", lambda yn, dt: Mission.rk4(yn, kernel, dt)),
+             ("kernel step", kernel.step)]
+    row_format = "{:>16}{:>16}"
+    print(row_format.format("", "steps/s"))
+    for name, step in cases:
+        print(row_format.format(name, round(steps_per_second(step, y, h, n_steps))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Description: Benchmark suite for the integrator and the mission pipeline. Every benchmark reports wall time, integration
+steps per second where it applies, and peak Python memory from tracemalloc. The import time of the simulator is measured
+in a fresh interpreter, together with the optional heavy modules (sympy, matplotlib) it pulled in, which should be
+none. Results are written to a JSON file so runs from different commits on the same machine can be compared.
+
+Usage, from the repository root:
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --out new.json --compare bench.json
+    python -m benchmarks.suite --check-import 0.1
+The last one only checks the import time of the simulation core and exits with status 1 on a regression. The limit
+applies to the import time on top of a bare import of numpy in the same kind of fresh interpreter, so a slow or busy
+machine does not fail the check. tests/test_imports.py runs the same check with pytest.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from simulator.ensemble import Ensemble
+from simulator.kernels import DragKernel
+from simulator.mission import Mission
+from simulator.setup import MissionSetup
+from tools import toslugs
+
+mass = toslugs(17.81 + 14.67 + 4.06, 'lb')
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_setup(n_phases=2, dt=0.01, altitude=4000.0):
+    """
+    Mission setup with the drogue and main of the rocket, extra phases split the drogue descent
+    :param n_phases: number of phases
+    :param dt: time step of every phase
+    :param altitude: initial altitude
+    :return: MissionSetup
+    """
+    bc = list(np.linspace(altitude, 600.0, n_phases)[1:]) + [0.0] if n_phases > 1 else [0.0]
+    chutes = ['24'] * (n_phases - 1) + ['certXXL']
+    return MissionSetup("Bench", n_phases, chutes, [mass] * n_phases, bc, [dt] * n_phases,
+                        np.array([altitude, 0.0]))
+
+
+def measure(func, repeat):
+    """
+    Runs a benchmark function and keeps the fastest run
+    :param func: function returning the number of integration steps it took, or None
+    :param repeat: number of runs
+    :return: dict of wall time (s), steps, steps per second and peak memory (bytes)
+    """
+    best = None
+    steps = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        steps = func()
+        wall = time.perf_counter() - start
+        best = wall if best is None else min(best, wall)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = {"wall": best, "peak_memory": peak}
+    if steps is not None:
+        result["steps"] = int(steps)
+        result["steps_per_sec"] = steps / best
+    return result
+
+
+def bench_rk4(n_steps):
+    """Mission.rk4 steps with the drag kernel"""
+    kernel = DragKernel(mass, np.pi, 0.75)
+
+    def func():
+        y = np.array([4000.0, 0.0])
+        for _ in range(n_steps):
+            y = Mission.rk4(y, kernel, 0.01)
+        return n_steps
+    return func
+
+
+def bench_sim(dt):
+    """Mission.sim over one phase from apogee to the ground"""
+    setup = make_setup(1, dt)
+    mission = Mission(setup, use_cache=False)
+    equ = Mission.make_equ(mass, setup.chutes[0].S, setup.chutes[0].cd)
+    y = np.array([4000.0, 0.0])
+
+    def func():
+        return len(mission.sim(y, dt, equ, 0)[0])
+    return func
+
+
+def bench_run_mission(n_phases):
+    """Mission.run_mission with the given number of phases"""
+    mission = Mission(make_setup(n_phases), use_cache=False)
+
+    def func():
+        state, time_ = mission.run_mission()
+        return len(state) - 1
+    return func
+
+
+def bench_make_equ(symbolic):
+    """Mission.make_equ construction of the drag kernel or of the sympy equations"""
+    def func():
+        if symbolic:
+            Mission.make_equ(mass, np.pi, 0.75, force=lambda r, v: 0.0)
+        else:
+            Mission.make_equ(mass, np.pi, 0.75)
+    return func
+
+
+def bench_ensemble(size):
+    """Ensemble.run without recording the trajectories"""
+    setups = [make_setup()] * size
+
+    def func():
+        ensemble = Ensemble(setups)
+        results = ensemble.run(record=False)
+        return int(np.sum(results.time_final[:, 1:] / ensemble.dt + 1))
+    return func
+
+
+heavy_modules = ["sympy", "matplotlib"]
+core_modules = ["simulator.mission", "simulator.ensemble", "simulator.sweep"]
+
+
+def import_time(module, repeat):
+    """
+    Import time of a module in a fresh interpreter
+    :param module: module name
+    :param repeat: number of interpreters started
+    :return: dict of the fastest wall time (s) and the heavy modules that were imported
+    """
+    code = ("import json, sys, time; s = time.perf_counter(); import {0}; w = time.perf_counter() - s; "
+            "print(json.dumps([w, [m for m in {1} if m in sys.modules]]))").format(module, heavy_modules)
+    runs = [json.loads(subprocess.check_output([sys.executable, "-c", code], cwd=root)) for _ in range(repeat)]
+    return {"wall": min(r[0] for r in runs), "heavy": runs[0][1]}
+
+
+def check_import(limit, repeat=5):
+    """
+    Import time regression check of the simulation core
+    :param limit: largest allowed import time of each core module on top of the import time of numpy (s)
+    :param repeat: number of interpreters started for each module
+    :return: True if every core module imports within the limit without a heavy module
+    """
+    base = import_time("numpy", repeat)["wall"]
+    print("{0:<24}{1:>10} ms  baseline".format("numpy", round(1e3 * base, 1)))
+    passed = True
+    for module in core_modules:
+        result = import_time(module, repeat)
+        ok = result["wall"] - base < limit and not result["heavy"]
+        passed = passed and ok
+        print("{0:<24}{1:>10} ms  {2}{3}".format(module, round(1e3 * result["wall"], 1), "ok" if ok else "FAIL",
+                                                 "" if not result["heavy"] else " imports " + ", ".join(result["heavy"])))
+    return passed
+
+
+def run(quick=False):
+    """
+    Runs every benchmark
+    :param quick: flag for fewer repeats and smaller sizes
+    :return: list of benchmark results
+    """
+    repeat = 1 if quick else 3
+    cases = [("rk4", {"steps": 2000}, bench_rk4(2000))]
+    cases += [("sim", {"dt": dt}, bench_sim(dt)) for dt in ([0.01] if quick else [0.01, 0.001])]
+    cases += [("run_mission", {"phases": n}, bench_run_mission(n)) for n in [1, 2, 3]]
+    cases += [("make_equ", {"symbolic": s}, bench_make_equ(s)) for s in [False, True]]
+    cases += [("ensemble", {"size": n}, bench_ensemble(n)) for n in ([10, 100] if quick else [10, 100, 1000])]
+    results = []
+    for name, params, func in cases:
+        result = {"name": name, "params": params}
+        result.update(measure(func, repeat))
+        results.append(result)
+    for module in core_modules:
+        result = {"name": "import", "params": {"module": module}}
+        result.update(import_time(module, repeat))
+        results.append(result)
+    return results
+
+
+def metadata():
+    """
+    :return: dict describing the commit and machine of the run
+    """
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "node": platform.node(), "time": time.time()}
+
+
+def key(result):
+    """Identifies a benchmark by its name and parameters"""
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def display(results, baseline=None):
+    """
+    Prints a table of the results and the ratio of wall times to a baseline run
+    :param results: list of benchmark results
+    :param baseline: optional list of benchmark results to compare with
+    :return: None
+    """
+    old = {key(r): r for r in baseline} if baseline is not None else {}
+    row_format = "{:<40}{:>12}{:>14}{:>14}{:>10}"
+    print(row_format.format("", "wall (ms)", "steps/s", "peak (kB)", "ratio"))
+    for r in results:
+        label = r["name"] + " " + ",".join("{0}={1}".format(k, v) for k, v in r["params"].items())
+        ratio = ""
+        if key(r) in old:
+            ratio = round(r["wall"] / old[key(r)]["wall"], 2)
+        print(row_format.format(label, round(1e3 * r["wall"], 3), round(r.get("steps_per_sec", 0.0)),
+                                round(r.get("peak_memory", 0) / 1e3, 1), ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Descent simulator benchmark suite")
+    parser.add_argument("--out", default="bench.json", help="output JSON file")
+    parser.add_argument("--compare", default=None, help="JSON file of a previous run to compare with")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats and smaller sizes")
+    parser.add_argument("--check-import", type=float, default=None, metavar="SECONDS",
+                        help="only check that the simulation core imports within this time on top of numpy")
+    args = parser.parse_args(argv)
+
+    if args.check_import is not None:
+        sys.exit(0 if check_import(args.check_import) else 1)
+
+    results = run(args.quick)
+    with open(args.out, "w") as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=2)
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    display(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
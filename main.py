@@ -1,5 +1,6 @@
 from tools import toslugs
 from simulator.mission import Mission
+from simulator.report import Report
 from setup_files.rocket_post_build_space_jam import rocket_setup, payload_setup
 import matplotlib.pyplot as plt
 import numpy as np
@@ -28,15 +29,6 @@ payload.plot_path("Payload Path")
 plt.legend()
 
 # Printing tables for results
-rocket.display('drift')
-payload.display('drift', append=True)
-print()
-rocket.display('velocity')
-payload.display('velocity', append=True)
-print()
-rocket.display('time')
-payload.display('time', append=True)
-print()
-rocket.display('ke', sections=["Aft", "Mid"])
-payload.display('ke', append=True, sections=["Payload", "Nose Cone"])
+report = Report.from_missions([rocket, payload], sections=[["Aft", "Mid"], ["Payload", "Nose Cone"]])
+print(report.text())
 print()
@@ -1,8 +1,9 @@
 from simulator import chute
+from simulator.atmosphere import Constant
 from tools import tofeet, toslugs
 
 g = 32.17405
-rho = 0.0023769
+atmosphere = Constant(0.0023769)  # density during the test falls
 
 # Defining Parachutes
 
@@ -34,21 +35,21 @@ pay_free.circular_area(diam, update=True)
 ###################### Mains ######################
 cd = 1.87
 classicII_44 = chute.Parachute(cd, None)
-classicII_44.effective_area(17.0, toslugs(4.4, 'lb'), rho, g, update=True)
+classicII_44.effective_area(17.0, toslugs(4.4, 'lb'), atmosphere, g, update=True)
 
 
 cd = 1.26
 certL = chute.Parachute(cd, None)
-certL.effective_area(17.0, toslugs(16.2, 'lb'), rho, g, update=True)
+certL.effective_area(17.0, toslugs(16.2, 'lb'), atmosphere, g, update=True)
 
 
 cd = 2.59
 certXL = chute.Parachute(cd, None)
-certXL.effective_area(17.0, toslugs(32.6, 'lb'), rho, g, update=True)
+certXL.effective_area(17.0, toslugs(32.6, 'lb'), atmosphere, g, update=True)
 
 cd = 2.92
 certXXL = chute.Parachute(cd, None)
-certXXL.effective_area(17.0, toslugs(60.0, 'lb'), rho, g, update=True)
+certXXL.effective_area(17.0, toslugs(60.0, 'lb'), atmosphere, g, update=True)
 
 
 diam = tofeet(58.0, 'in')
@@ -0,0 +1,65 @@
+"""
+Description: Closed form solution of a descent phase with quadratic drag, constant density and constant gravity.
+
+Details: Writing the descent speed as u = -v the equation of motion is du/dt = g - k*u**2, with terminal velocity
+vt = sqrt(g/k) and time constant tau = vt/g. The speed after falling a height H is
+    u**2 = vt**2 - (vt**2 - u0**2)*exp(-2*k*H)
+and the time to fall that height is
+    t = tau*(k*H + ln((vt + u)/(vt + u0)))
+which holds both below and above terminal velocity. Every function works on floats as well as ndarrays, so whole design
+sweeps are evaluated in one call. The solution only covers descending sections (v0 <= 0), the same as the numerical
+equations of motion.
+"""
+import numpy as np
+from simulator.kernels import g
+
+
+def terminal_velocity(k):
+    """
+    Terminal descent speed
+    :param k: drag constant
+    :return: terminal speed (positive)
+    """
+    return np.sqrt(g / k)
+
+
+def phase_end(r0, v0, k, bc):
+    """
+    State at the end of a descent phase
+    :param r0: initial altitude
+    :param v0: initial velocity (not positive)
+    :param k: drag constant
+    :param bc: breaking condition altitude
+    :return:
+        t: time to reach the breaking condition
+        v: velocity at the breaking condition
+    """
+    assert np.all(np.asarray(v0) <= 0.0), "The analytic solution only covers descending sections (v0 <= 0)"
+    vt = terminal_velocity(k)
+    u0 = -v0
+    height = np.maximum(r0 - bc, 0.0)
+    u = np.sqrt(vt ** 2 - (vt ** 2 - u0 ** 2) * np.exp(-2.0 * k * height))
+    t = (vt / g) * (k * height + np.log((vt + u) / (vt + u0)))
+    return t, -u
+
+
+def state_at(r0, v0, k, t):
+    """
+    State after descending for a time t
+    :param r0: initial altitude
+    :param v0: initial velocity (not positive)
+    :param k: drag constant
+    :param t: time since the start of the phase, float or ndarray
+    :return:
+        r: altitude at time t
+        v: velocity at time t
+    """
+    assert np.all(np.asarray(v0) <= 0.0), "The analytic solution only covers descending sections (v0 <= 0)"
+    vt = terminal_velocity(k)
+    tau = vt / g
+    u0 = -v0
+    c = (vt - u0) / (vt + u0)
+    decay = c * np.exp(-2.0 * t / tau)
+    u = vt * (1.0 - decay) / (1.0 + decay)
+    r = r0 - vt * t - np.log((1.0 + decay) / (1.0 + c)) / k
+    return r, -u
@@ -0,0 +1,101 @@
+"""
+Description: Atmosphere models that give the air density used by the drag equations. Constant is the sea level density
+the simulation has always used, ISA is the International Standard Atmosphere with an optional temperature offset for
+the launch site.
+
+Details: Altitudes given to the models are above the launch site, the same as the altitudes of the state vector. The
+ISA density is tabulated once per (temperature offset, site elevation, spacing) and the table is shared by every model
+with the same settings. Looking up the density is an index computation and one linear blend, on floats for the Mission
+class and on ndarrays for the ensemble engines.
+"""
+import functools
+import numpy as np
+
+# English units: Rankine, ft, lbf/ft^2, slug/ft^3
+T0 = 518.67
+P0 = 2116.22
+LAPSE = 0.00356616
+R = 1716.49
+G0 = 32.17405
+H_TROPOPAUSE = 36089.24
+
+
+@functools.lru_cache(maxsize=32)
+def density_table(d_temp, site, h_low, h_high, dh):
+    """
+    Tabulates the ISA density against altitude above the launch site
+    :param d_temp: temperature offset from the standard atmosphere (Rankine)
+    :param site: elevation of the launch site above sea level (ft)
+    :param h_low: lowest altitude of the table above the launch site (ft)
+    :param h_high: highest altitude of the table above the launch site (ft)
+    :param dh: altitude spacing of the table (ft)
+    :return: ndarray of densities
+    """
+    h = site + h_low + dh * np.arange(int(np.ceil((h_high - h_low) / dh)) + 1)
+    t_std = np.where(h < H_TROPOPAUSE, T0 - LAPSE * h, T0 - LAPSE * H_TROPOPAUSE)
+    p_trop = P0 * (1.0 - LAPSE * H_TROPOPAUSE / T0) ** (G0 / (R * LAPSE))
+    p = np.where(h < H_TROPOPAUSE,
+                 P0 * (1.0 - LAPSE * np.minimum(h, H_TROPOPAUSE) / T0) ** (G0 / (R * LAPSE)),
+                 p_trop * np.exp(-G0 * (h - H_TROPOPAUSE) / (R * (T0 - LAPSE * H_TROPOPAUSE))))
+    table = p / (R * (t_std + d_temp))
+    table.flags.writeable = False
+    return table
+
+
+class Constant(object):
+    def __init__(self, rho=0.0023769):
+        """
+        Air density that does not change with altitude
+        :param rho: air density (slug/ft^3)
+        """
+        self.rho = rho
+        self.constant = True
+        self.key = ("constant", float(rho))
+
+    def density(self, h):
+        """
+        :param h: altitude above the launch site, float or ndarray
+        :return: air density with the same shape as h
+        """
+        if isinstance(h, np.ndarray):
+            return np.full(h.shape, self.rho)
+        return self.rho
+
+
+class ISA(object):
+    def __init__(self, d_temp=0.0, site=0.0, h_low=-1000.0, h_high=40000.0, dh=10.0):
+        """
+        International Standard Atmosphere
+        :param d_temp: temperature offset of the launch site from the standard atmosphere (Rankine or Fahrenheit
+        degrees)
+        :param site: elevation of the launch site above sea level (ft)
+        :param h_low: lowest altitude of the lookup table above the launch site (ft)
+        :param h_high: highest altitude of the lookup table above the launch site (ft)
+        :param dh: altitude spacing of the lookup table (ft)
+        """
+        self.constant = False
+        self.key = ("isa", float(d_temp), float(site), float(h_low), float(h_high), float(dh))
+        self.h_low = h_low
+        self.inv_dh = 1.0 / dh
+        self.table = density_table(float(d_temp), float(site), float(h_low), float(h_high), float(dh))
+        self.last = len(self.table) - 1
+        self.values = self.table.tolist()
+
+    def density(self, h):
+        """
+        :param h: altitude above the launch site, float or ndarray. Altitudes outside the table use its end values.
+        :return: air density with the same shape as h
+        """
+        if isinstance(h, np.ndarray):
+            f = np.clip((h - self.h_low) * self.inv_dh, 0.0, self.last)
+            i = np.minimum(f.astype(int), self.last - 1)
+            w = f - i
+            return self.table[i] * (1.0 - w) + self.table[i + 1] * w
+        f = (h - self.h_low) * self.inv_dh
+        if f <= 0.0:
+            return self.values[0]
+        if f >= self.last:
+            return self.values[-1]
+        i = int(f)
+        w = f - i
+        return self.values[i] * (1.0 - w) + self.values[i + 1] * w
@@ -0,0 +1,82 @@
+"""
+Description: The TrajectoryBuffer class stores the state vectors and times of a run in one preallocated, contiguous
+array that the integrators write into in place.
+
+Details: The buffer is sized from an estimate of the number of steps before the run starts. If the estimate is too
+small the buffer grows by doubling its capacity, so the number of copies stays logarithmic in the length of the run
+instead of one copy per appended state. Views returned by the buffer are only valid until the next time it grows, so
+the Mission class takes its views once the run is finished.
+"""
+import numpy as np
+
+
+class TrajectoryBuffer(object):
+    def __init__(self, n_state, capacity=1024):
+        """
+        :param n_state: length of the state vector
+        :param capacity: number of rows to preallocate
+        """
+        self.data = np.empty((max(int(capacity), 1), n_state))
+        self.time = np.empty(self.data.shape[0])
+        self.size = 0
+
+    def reserve(self, n):
+        """
+        Makes sure there is room for n more rows, doubling the capacity until there is
+        :param n: number of rows that will be appended
+        :return: None
+        """
+        capacity = self.data.shape[0]
+        if self.size + n <= capacity:
+            return
+        while capacity < self.size + n:
+            capacity *= 2
+        data = np.empty((capacity, self.data.shape[1]))
+        data[:self.size] = self.data[:self.size]
+        time = np.empty(capacity)
+        time[:self.size] = self.time[:self.size]
+        self.data = data
+        self.time = time
+
+    def append(self, t, y):
+        """
+        Writes one state vector at the end of the buffer
+        :param t: time of the state vector
+        :param y: state vector
+        :return: None
+        """
+        if self.size == self.data.shape[0]:
+            self.reserve(1)
+        self.data[self.size] = y
+        self.time[self.size] = t
+        self.size += 1
+
+    def extend(self, t, y):
+        """
+        Writes several state vectors at the end of the buffer
+        :param t: (m, ) ndarray of times
+        :param y: (m, n) ndarray of state vectors
+        :return: None
+        """
+        m = len(t)
+        self.reserve(m)
+        self.data[self.size:self.size + m] = y
+        self.time[self.size:self.size + m] = t
+        self.size += m
+
+    def last(self):
+        """
+        :return: time and a copy of the last state vector in the buffer
+        """
+        return self.time[self.size - 1], self.data[self.size - 1].copy()
+
+    def view(self, start=0, stop=None):
+        """
+        Zero copy view of the stored rows
+        :param start: first row
+        :param stop: one past the last row, default is the end of the stored rows
+        :return: state vectors and times between start and stop
+        """
+        if stop is None:
+            stop = self.size
+        return self.data[start:stop], self.time[start:stop]
@@ -0,0 +1,89 @@
+"""
+Description: Bounded least recently used caches shared by every Mission in the process. equations holds the equations
+of motion keyed by the physical parameters of a phase, phases holds the integrated trajectory of a phase keyed by its
+initial state and everything else that determines it. Trade studies that repeat the same chutes and masses skip both
+building the equations and integrating the repeated phases. The phase cache is bounded by the bytes of the cached
+trajectories as well as by the number of entries, and a phase larger than maxentry is not copied into it at all, so
+fine time step runs do not keep a second copy of their trajectories.
+"""
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    def __init__(self, maxsize=128, maxbytes=None, maxentry=None):
+        """
+        :param maxsize: largest number of entries, the least recently used entry is evicted past it
+        :param maxbytes: optional largest total size of the entries in bytes, as given to put()
+        :param maxentry: optional largest size of one entry in bytes, by default maxbytes
+        """
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.maxentry = maxbytes if maxentry is None else maxentry
+        self.data = OrderedDict()
+        self.sizes = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        :param key: hashable key
+        :return: cached value or None
+        """
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def fits(self, nbytes):
+        """
+        :param nbytes: size of an entry in bytes
+        :return: True if an entry of that size can be cached
+        """
+        return self.maxentry is None or nbytes <= self.maxentry
+
+    def put(self, key, value, nbytes=0):
+        """
+        :param key: hashable key
+        :param value: value to cache
+        :param nbytes: default 0, size of the value in bytes, an entry larger than maxentry is not cached
+        :return: None
+        """
+        if not self.fits(nbytes):
+            return
+        self.nbytes += nbytes - self.sizes.get(key, 0)
+        self.sizes[key] = nbytes
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize or (self.maxbytes is not None and self.nbytes > self.maxbytes):
+            old, _ = self.data.popitem(last=False)
+            self.nbytes -= self.sizes.pop(old)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Empties the cache and resets the counters
+        :return: None
+        """
+        self.data.clear()
+        self.sizes.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        :return: dict of hits, misses, evictions, size, maxsize, nbytes and maxbytes
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self.data),
+                "maxsize": self.maxsize, "nbytes": self.nbytes, "maxbytes": self.maxbytes}
+
+
+equations = LRUCache(256)
+phases = LRUCache(64, maxbytes=16 * 2 ** 20, maxentry=2 * 2 ** 20)
@@ -19,16 +19,19 @@ class Parachute(object):
         self.cd = c_drag
         self.S = surf_area
 
-    def effective_area(self, v, m, rho, g, update=True):
+    def effective_area(self, v, m, rho, g, update=True, alt=0.0):
         """
         Calculate effective area of a parachute
         :param v: velocity of parachute
         :param m: mass attached to parachute
-        :param rho: air density during descent
+        :param rho: air density during descent, or an atmosphere model from atmosphere.py
         :param g: gravitational acceleration at location
         :param update: default True, flag to save over surface area (S)
+        :param alt: altitude above the launch site of the test fall, used with an atmosphere model
         :return: effective surface area backed out from test fall
         """
+        if hasattr(rho, "density"):
+            rho = rho.density(alt)
         S = (m * g) / (0.5 * self.cd * rho * v ** 2)
         if update:
             self.S = S
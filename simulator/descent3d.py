@@ -0,0 +1,179 @@
+"""
+Description: The Descent3D class integrates a mission in three dimensions through a set of wind scenarios. Every wind
+scenario is one row of a (N, 6) state array of position and velocity (x, y, z, vx, vy, vz) and all scenarios are
+integrated together with a vectorized Runge-Kutta 4 step.
+
+Details: Drag acts on the velocity relative to the air, so the horizontal velocity is pulled toward the local wind and
+the drift is the horizontal position at landing instead of the wind speed times the descent time. The wind at each
+altitude comes from the precomputed lookup table of a WindTable. With no wind the vertical motion is the same as the
+1D simulation of the Mission class, including its breaking conditions and time steps. Every scenario can also have its
+own mission setup, so the drift of many missions is integrated in the same pass.
+"""
+import numpy as np
+from simulator.kernels import drag_constant, g
+from simulator.wind import WindTable
+
+
+class Descent3DResults(object):
+    def __init__(self, time_final, pos_final, vel_final, ke, path, time):
+        """
+        Container for the outcome of a wind scenario run
+        :param time_final: (N, n + 1) ndarray, total descent time followed by the time of each phase
+        :param pos_final: (N, n, 3) ndarray of the position at the end of each phase
+        :param vel_final: (N, n, 3) ndarray of the velocity at the end of each phase
+        :param ke: (N, n) ndarray of the kinetic energy at the end of each phase
+        :param path: list of (m, 6) ndarrays of the trajectory of each scenario, empty when not recorded
+        :param time: list of (m, ) ndarrays of the time of each trajectory, empty when not recorded
+        """
+        self.time_final = time_final
+        self.pos_final = pos_final
+        self.vel_final = vel_final
+        self.ke = ke
+        self.path = path
+        self.time = time
+        self.drift = np.hypot(pos_final[:, -1, 0], pos_final[:, -1, 1])
+
+
+class Descent3D(object):
+    def __init__(self, setup, winds, dz=5.0):
+        """
+        :param setup: MissionSetup of the mission, or a list of MissionSetup with one for each scenario. Every setup
+        must have the same number of phases and share the same atmosphere model.
+        :param winds: list of WindProfile, one for each scenario
+        :param dz: altitude spacing of the wind lookup table (ft)
+        """
+        setups = setup if isinstance(setup, list) else [setup] * len(winds)
+        assert len(setups) == len(winds), "There must be one setup for each wind scenario"
+        setup = setups[0]
+        self.n = setup.n
+        for other in setups:
+            assert other.n == self.n, "Every setup must have the same number of phases"
+        if all(other.atmosphere.constant for other in setups):
+            rho = [other.atmosphere.rho for other in setups]
+            self.density = None
+        else:
+            for other in setups:
+                assert other.atmosphere is setup.atmosphere, "Every setup must share the same atmosphere model"
+            rho = [1.0] * len(setups)
+            self.density = setup.atmosphere.density
+        self.k = np.array([[drag_constant(other.masses[i], other.chutes[i].S, other.chutes[i].cd, rho[j])
+                            for i in range(self.n)] for j, other in enumerate(setups)], dtype=float)
+        self.mass = np.array([other.masses for other in setups], dtype=float)
+        self.dt = np.array([other.dt for other in setups], dtype=float)
+        self.bc = np.array([other.bc for other in setups], dtype=float)
+        self.wind = WindTable(winds, dz)
+        self.gravity = np.array([0.0, 0.0, g])
+        self.state = np.zeros((len(winds), 6))
+        self.state[:, 2] = [other.initial_state[0] for other in setups]
+        self.state[:, 5] = [other.initial_state[1] for other in setups]
+        self.results = None
+
+    def run(self, record=False):
+        """
+        Evaluates all phases for every wind scenario
+        :param record: flag to keep the full trajectory of every scenario
+        :return: Descent3DResults
+        """
+        n_sc = self.state.shape[0]
+        y = self.state.copy()
+        time_final = np.zeros((n_sc, self.n + 1))
+        pos_final = np.zeros((n_sc, self.n, 3))
+        vel_final = np.zeros((n_sc, self.n, 3))
+        phases = []
+        for i in range(self.n):
+            steps, history = self.sim(y, self.k[:, i], self.dt[:, i], self.bc[:, i], record)
+            time_final[:, i + 1] = np.maximum(steps - 1, 0) * self.dt[:, i]
+            pos_final[:, i] = y[:, :3]
+            vel_final[:, i] = y[:, 3:]
+            phases.append((steps, history))
+        time_final[:, 0] = time_final[:, 1:].sum(axis=1)
+        ke = 0.5 * self.mass * np.sum(vel_final ** 2, axis=2)
+        path, time = [], []
+        if record:
+            path, time = self.make_paths(phases)
+        self.results = Descent3DResults(time_final, pos_final, vel_final, ke, path, time)
+        return self.results
+
+    def sim(self, y, k, dt, bc, record):
+        """
+        Integrates every scenario until it reaches the breaking altitude. The state array is updated in place.
+        Scenarios that have finished are frozen by the active mask and dropped from the working arrays once they make up
+        half of them.
+        :param y: (N, 6) ndarray of the state of each scenario
+        :param k: (N,) ndarray of the drag constant of the phase for each scenario
+        :param dt: (N,) ndarray of the time step of the phase for each scenario
+        :param bc: (N,) ndarray of the breaking altitude of the phase for each scenario
+        :param record: flag to keep each integrated state
+        :return:
+            steps: (N,) ndarray of the number of steps each scenario took
+            history: list of (index, state) pairs for each step when record is True
+        """
+        steps = np.zeros(y.shape[0], dtype=int)
+        history = []
+        idx = np.nonzero(y[:, 2] > bc)[0]
+        ya = y[idx]
+        base = self.wind.offset(idx)
+        ka, ha, bca = k[idx], dt[idx, None], bc[idx]
+        active = np.ones(idx.size, dtype=bool)
+        count = np.zeros(idx.size, dtype=int)
+        while idx.size:
+            yn = self.rk4(base, ya, ka, ha)
+            ya = np.where(active[:, None], yn, ya)
+            count += active
+            if record:
+                history.append((idx[active], ya[active]))
+            active &= ya[:, 2] > bca
+            if np.count_nonzero(active) <= idx.size // 2:
+                y[idx] = ya
+                steps[idx] = count
+                idx, ya, base, ka, ha, bca, count = [a[active] for a in (idx, ya, base, ka, ha, bca, count)]
+                active = np.ones(idx.size, dtype=bool)
+        return steps, history
+
+    def equ(self, base, y, k):
+        """
+        Time derivative of the state of a set of scenarios
+        :param base: (m, ) ndarray of the lookup table offset of each row, see WindTable.offset
+        :param y: (m, 6) ndarray of states
+        :param k: (m, ) ndarray of drag constants, per unit density with an atmosphere model
+        :return: (m, 6) ndarray of the time derivative
+        """
+        rel = y[:, 3:] - self.wind.lookup(base, y[:, 2])
+        if self.density is not None:
+            k = k * self.density(y[:, 2])
+        drag = (-k * np.sqrt(np.einsum("ij,ij->i", rel, rel)))[:, None]
+        return np.concatenate((y[:, 3:], drag * rel - self.gravity), axis=1)
+
+    def rk4(self, base, yn, k, h):
+        """
+        Vectorized Runge-Kutta 4 integrator
+        :param base: (m, ) ndarray of the lookup table offset of each row
+        :param yn: (m, 6) ndarray of the current states
+        :param k: (m, ) ndarray of drag constants
+        :param h: (m, 1) ndarray of time steps
+        :return: (m, 6) ndarray of the states after one time step
+        """
+        k1 = self.equ(base, yn, k)
+        k2 = self.equ(base, yn + (0.5 * h) * k1, k)
+        k3 = self.equ(base, yn + (0.5 * h) * k2, k)
+        k4 = self.equ(base, yn + h * k3, k)
+        return yn + (h / 6.0) * (k1 + 2.0 * k2 + 2.0 * k3 + k4)
+
+    def make_paths(self, phases):
+        """
+        Splits the recorded steps into the trajectory of each scenario
+        :return: list of trajectories and list of their times
+        """
+        n_sc = self.state.shape[0]
+        parts = [[self.state[s][None, :]] for s in range(n_sc)]
+        times = [[np.array([0.0])] for _ in range(n_sc)]
+        for i, (steps, history) in enumerate(phases):
+            if not history:
+                continue
+            idx = np.concatenate([h[0] for h in history])
+            states = np.concatenate([h[1] for h in history])
+            order = np.argsort(idx, kind="stable")
+            for s, chunk in enumerate(np.split(states[order], np.cumsum(steps)[:-1])):
+                parts[s].append(chunk)
+                times[s].append(times[s][-1][-1] + np.arange(len(chunk)) * self.dt[s, i])
+        return [np.concatenate(p) for p in parts], [np.concatenate(t) for t in times]
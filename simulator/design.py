@@ -0,0 +1,143 @@
+"""
+Description: The ChuteSelector class searches the parachute catalog for the drogue, main and main deployment altitude
+choices that meet the kinetic energy and descent time limits of a mission.
+
+Details: Every candidate is evaluated with the closed form descent solution, so all drogue and main pairs are handled
+together as arrays. For a pair of parachutes the landing kinetic energy decreases and the descent time increases as the
+main is deployed higher, so the feasible deployment altitudes are a single interval found by bisection on each limit.
+Mains that cannot land under the kinetic energy limit even at terminal velocity, drogues that take longer than the time
+limit on their own, and pairs where the main falls faster than the drogue are pruned before any bisection. The Pareto
+front trades drift (descent time in a given wind) against the kinetic energy margin.
+"""
+import numpy as np
+from simulator import analytic
+from simulator.kernels import drag_constant
+
+
+class ChuteSelector(object):
+    def __init__(self, catalog, sections, state=np.array([4000.0, 0.0]), ke_limit=75.0, time_limit=90.0,
+                 deploy_range=(200.0, None), wind=20.0):
+        """
+        :param catalog: dict of {name: Parachute}, see setup_files/mission_chutes.py
+        :param sections: list of the masses of the sections that land separately, the parachutes carry their sum
+        :param state: initial state vector
+        :param ke_limit: largest landing kinetic energy of any section (ft lbs)
+        :param time_limit: longest descent time (s)
+        :param deploy_range: lowest and highest main deployment altitude (ft), None for the initial altitude
+        :param wind: wind speed used for the drift distance (mph)
+        """
+        assert len(sections) > 0, "\"sections\" must have at least one mass"
+        self.catalog = catalog
+        self.sections = np.asarray(sections, dtype=float)
+        self.mass = float(self.sections.sum())
+        self.state = np.asarray(state, dtype=float).flatten()
+        self.ke_limit = ke_limit
+        self.time_limit = time_limit
+        low, high = deploy_range
+        self.deploy_range = (low, self.state[0] if high is None else min(high, self.state[0]))
+        self.wind = wind
+        self.feasible = []
+        self.pareto = []
+
+    @classmethod
+    def from_setup(cls, setup, catalog, sections=None, **kwargs):
+        """
+        Builds a selector from the mass, initial state and limits of a MissionSetup
+        :param setup: MissionSetup
+        :param catalog: dict of {name: Parachute}
+        :param sections: list of section masses, default is the mass of the last phase as one section
+        :return: ChuteSelector
+        """
+        if sections is None:
+            sections = [setup.masses[-1]]
+        return cls(catalog, sections, setup.initial_state, setup.max_ke, setup.max_time, **kwargs)
+
+    def descent(self, k_drogue, k_main, deploy):
+        """
+        Descent time and landing velocity of drogue and main pairs
+        :param k_drogue: ndarray of drogue drag constants
+        :param k_main: ndarray of main drag constants
+        :param deploy: ndarray of main deployment altitudes
+        :return: descent time and landing velocity
+        """
+        t_1, v_1 = analytic.phase_end(self.state[0], self.state[1], k_drogue, deploy)
+        t_2, v_2 = analytic.phase_end(np.minimum(deploy, self.state[0]), v_1, k_main, 0.0)
+        return t_1 + t_2, v_2
+
+    def landing_ke(self, v):
+        """
+        :param v: landing velocity
+        :return: largest landing kinetic energy of any section
+        """
+        return 0.5 * self.sections.max() * v ** 2
+
+    def bisect(self, k_drogue, k_main, check, n_iter=50):
+        """
+        Bisection on the deployment altitude of every pair at once. check must go from False to True as the deployment
+        altitude increases.
+        :param k_drogue: ndarray of drogue drag constants
+        :param k_main: ndarray of main drag constants
+        :param check: function of (time, landing velocity) returning a bool ndarray
+        :param n_iter: number of bisection iterations
+        :return: lowest deployment altitude where check is True
+        """
+        low = np.full(k_drogue.shape, self.deploy_range[0])
+        high = np.full(k_drogue.shape, self.deploy_range[1])
+        for _ in range(n_iter):
+            mid = 0.5 * (low + high)
+            ok = check(*self.descent(k_drogue, k_main, mid))
+            high = np.where(ok, mid, high)
+            low = np.where(ok, low, mid)
+        return high
+
+    def run(self, samples=50):
+        """
+        Finds the feasible deployment interval of every parachute pair and the Pareto front of drift against kinetic
+        energy margin
+        :param samples: number of deployment altitudes evaluated in each feasible interval for the Pareto front
+        :return: list of Pareto optimal designs as dicts
+        """
+        names = list(self.catalog)
+        k = np.array([drag_constant(self.mass, self.catalog[name].S, self.catalog[name].cd) for name in names])
+        low, high = self.deploy_range
+        # mains that land too hard even at terminal velocity
+        main_ok = self.landing_ke(analytic.terminal_velocity(k)) <= self.ke_limit
+        # drogues that are too slow without ever deploying a main
+        drogue_ok = analytic.phase_end(self.state[0], self.state[1], k, 0.0)[0] <= self.time_limit
+        d_idx, m_idx = np.nonzero(drogue_ok[:, None] & main_ok[None, :] & (k[None, :] > k[:, None]))
+        k_d, k_m = k[d_idx], k[m_idx]
+
+        time_low, v_low = self.descent(k_d, k_m, np.full(k_d.shape, low))
+        time_high, v_high = self.descent(k_d, k_m, np.full(k_d.shape, high))
+        ok = (self.landing_ke(v_high) <= self.ke_limit) & (time_low <= self.time_limit)
+        d_idx, m_idx, k_d, k_m = d_idx[ok], m_idx[ok], k_d[ok], k_m[ok]
+        ke_ok = self.landing_ke(v_low[ok]) <= self.ke_limit
+        time_ok = time_high[ok] <= self.time_limit
+
+        deploy_min = np.where(ke_ok, low, self.bisect(k_d, k_m, lambda t, v: self.landing_ke(v) <= self.ke_limit))
+        deploy_max = np.where(time_ok, high, self.bisect(k_d, k_m, lambda t, v: t > self.time_limit))
+        ok = deploy_min <= deploy_max
+        self.feasible = [{"drogue": names[d], "main": names[m], "deploy_min": float(lo), "deploy_max": float(hi)}
+                         for d, m, lo, hi in zip(d_idx[ok], m_idx[ok], deploy_min[ok], deploy_max[ok])]
+        if not self.feasible:
+            self.pareto = []
+            return self.pareto
+
+        frac = np.linspace(0.0, 1.0, samples)
+        deploy = deploy_min[ok, None] + (deploy_max[ok] - deploy_min[ok])[:, None] * frac[None, :]
+        pair = np.repeat(np.arange(np.count_nonzero(ok)), samples)
+        deploy = deploy.flatten()
+        time, v = self.descent(k_d[ok][pair], k_m[ok][pair], deploy)
+        drift = 1.466667 * self.wind * time
+        margin = self.ke_limit - self.landing_ke(v)
+        order = np.lexsort((-margin, drift))
+        front = []
+        best = -np.inf
+        for i in order:
+            if margin[i] > best:
+                best = margin[i]
+                front.append(i)
+        self.pareto = [{"drogue": self.feasible[pair[i]]["drogue"], "main": self.feasible[pair[i]]["main"],
+                        "deploy": float(deploy[i]), "time": float(time[i]), "drift": float(drift[i]),
+                        "ke": float(self.ke_limit - margin[i]), "ke_margin": float(margin[i])} for i in front]
+        return self.pareto
@@ -0,0 +1,213 @@
+"""
+Description: The Ensemble class runs many descent missions at once. Every member of the ensemble is one set of mission
+parameters (mass, drag, breaking conditions, time step and initial state) and all members are integrated together as a
+single (N, 2) state array using a vectorized Runge-Kutta 4 step.
+
+Details: The equations of motion are the drag plus gravity kernels from kernels.py evaluated directly on arrays. Each
+member stops on its own breaking condition through an active mask, so members that reach their breaking altitude early
+are frozen while the rest of the ensemble keeps integrating. The results for each member are
+returned in the same Results container used by the Mission class along with summary statistics over the ensemble.
+Custom force models and the dp45 integrator of the Mission class are not supported, setups that use them are rejected
+instead of being integrated with the drag plus gravity model.
+"""
+import numpy as np
+from simulator.kernels import drag_constant, drag_rk4, drag_rk4_density
+from simulator.mission import Results
+
+
+class EnsembleResults(object):
+    def __init__(self, time_final, pos_final, vel_final, ke, members):
+        """
+        Container for the outcome of an ensemble run
+        :param time_final: (N, n + 1) ndarray, total descent time followed by the time of each phase
+        :param pos_final: (N, n) ndarray of the altitude at the end of each phase
+        :param vel_final: (N, n) ndarray of the velocity at the end of each phase
+        :param ke: (N, n) ndarray of the kinetic energy at the end of each phase
+        :param members: list of Results, one for each member of the ensemble
+        """
+        self.time_final = time_final
+        self.pos_final = pos_final
+        self.vel_final = vel_final
+        self.ke = ke
+        self.members = members
+
+    def summary(self, percentiles=(5, 50, 95)):
+        """
+        Summary statistics over the ensemble for every phase
+        :param percentiles: percentiles to report
+        :return: dict of {field: {statistic: ndarray}} for time_final, vel_final and ke
+        """
+        stats = {}
+        for name in ["time_final", "vel_final", "ke"]:
+            data = getattr(self, name)
+            stats[name] = {"mean": data.mean(axis=0),
+                           "std": data.std(axis=0),
+                           "min": data.min(axis=0),
+                           "max": data.max(axis=0)}
+            for p, value in zip(percentiles, np.percentile(data, percentiles, axis=0)):
+                stats[name]["p" + str(p)] = value
+        return stats
+
+
+class Ensemble(object):
+    def __init__(self, setups, instrument=None):
+        """
+        This class is given a list of mission setups and integrates all of them together. Every setup must have the
+        same number of phases. The method run() is called after initialization of the Ensemble class.
+        :param setups: list of MissionSetup objects, one for each member of the ensemble
+        :param instrument: optional Instrument from instrument.py, the steps of a phase are the vectorized steps and
+        the evaluations of the equations of motion are counted for every member
+        """
+        assert len(setups) > 0, "\"setups\" must contain at least one MissionSetup"
+        n = setups[0].n
+        for setup in setups:
+            assert setup.n == n, "Every setup in the ensemble must have the same number of phases"
+            assert all(force is None for force in setup.forces) and all(m == "rk4" for m in setup.integrator), \
+                "The batch engine only integrates the drag plus gravity model with the rk4 integrator"
+        self.n = n
+        self.setups = setups
+        self.titles = [setup.title for setup in setups]
+        self.state = np.array([setup.initial_state for setup in setups], dtype=float)
+        self.mass = np.array([setup.masses for setup in setups], dtype=float)
+        self.dt = np.array([setup.dt for setup in setups], dtype=float)
+        self.bc = np.array([setup.bc for setup in setups], dtype=float)
+        if all(setup.atmosphere.constant for setup in setups):
+            rho = [setup.atmosphere.rho for setup in setups]
+            self.density = None
+        else:
+            for setup in setups:
+                assert setup.atmosphere is setups[0].atmosphere, "Every setup must share the same atmosphere model"
+            rho = [1.0] * len(setups)
+            self.density = setups[0].atmosphere.density
+        self.k = np.array([[drag_constant(setup.masses[i], setup.chutes[i].S, setup.chutes[i].cd, rho[j])
+                            for i in range(n)] for j, setup in enumerate(setups)], dtype=float)
+        self.results = None
+        self.instrument = instrument
+
+    def run(self, record=True):
+        """
+        Evaluates all phases for every member of the ensemble. Each phase is integrated until every member has met
+        its breaking condition, with the final state of a phase being the initial state of the next phase.
+        :param record: default True, flag to keep the full trajectory of every member. When False only the end of each
+        phase is kept which is much lighter for large ensembles.
+        :return: EnsembleResults
+        """
+        n_mem = self.state.shape[0]
+        y = self.state.copy()
+        time_final = np.zeros((n_mem, self.n + 1))
+        pos_final = np.zeros((n_mem, self.n))
+        vel_final = np.zeros((n_mem, self.n))
+        paths = []
+        for i in range(self.n):
+            info = None if self.instrument is None else self.instrument.start("ensemble", i, members=n_mem)
+            steps, history = self.sim(y, self.k[:, i], self.dt[:, i], self.bc[:, i], record)
+            if info is not None:
+                self.instrument.stop(info, steps.max(initial=0), 4 * steps.sum())
+            time_final[:, i + 1] = np.maximum(steps - 1, 0) * self.dt[:, i]
+            pos_final[:, i] = y[:, 0]
+            vel_final[:, i] = y[:, 1]
+            paths.append((steps, history))
+        time_final[:, 0] = time_final[:, 1:].sum(axis=1)
+        ke = 0.5 * self.mass * vel_final ** 2
+        members = self.make_results(time_final, pos_final, vel_final, ke, paths, record)
+        self.results = EnsembleResults(time_final, pos_final, vel_final, ke, members)
+        return self.results
+
+    def save(self, path, dtype=np.float64, winds=()):
+        """
+        Writes the results of every member of the last run to an archive, see store.py
+        :param path: archive directory
+        :param dtype: dtype of the stored state vectors, np.float32 halves the size of the archive
+        :param winds: default none, wind speeds (mph) to store the 3D drift of, see store.write()
+        :return: None
+        """
+        from simulator import store
+        store.write(path, self.results.members, self.setups, dtype, winds)
+
+    def sim(self, y, k, dt, bc, record):
+        """
+        Integrates every member of the ensemble until it meets its breaking condition. The state array is updated in
+        place. Members that have finished are frozen by the active mask and dropped from the working arrays once they
+        make up half of them.
+        :param y: (N, 2) ndarray of the state of each member
+        :param k: (N,) ndarray of the drag constant for each member, per unit density with an atmosphere model
+        :param dt: (N,) ndarray of the time step for each member
+        :param bc: (N,) ndarray of the breaking condition for each member
+        :param record: flag to keep each integrated state
+        :return:
+            steps: (N,) ndarray of the number of steps each member took
+            history: list of (index, state) pairs for each step when record is True
+        """
+        steps = np.zeros(y.shape[0], dtype=int)
+        history = []
+        idx = np.nonzero(y[:, 0] > bc)[0]
+        r, v = y[idx, 0], y[idx, 1]
+        ka, ha, bca = k[idx], dt[idx], bc[idx]
+        active = np.ones(idx.size, dtype=bool)
+        count = np.zeros(idx.size, dtype=int)
+        while idx.size:
+            if self.density is None:
+                r_n, v_n = drag_rk4(r, v, ka, ha)
+            else:
+                r_n, v_n = drag_rk4_density(r, v, ka, ha, self.density)
+            r = np.where(active, r_n, r)
+            v = np.where(active, v_n, v)
+            count += active
+            if record:
+                history.append((idx[active], np.column_stack((r[active], v[active]))))
+            active &= r > bca
+            n_active = np.count_nonzero(active)
+            if n_active <= idx.size // 2:
+                y[idx, 0] = r
+                y[idx, 1] = v
+                steps[idx] = count
+                idx, r, v, ka, ha, bca, count = [a[active] for a in (idx, r, v, ka, ha, bca, count)]
+                active = np.ones(idx.size, dtype=bool)
+        return steps, history
+
+    def make_results(self, time_final, pos_final, vel_final, ke, paths, record):
+        """
+        Splits the ensemble arrays into a Results object for each member in the same layout as Mission.run_mission
+        :return: list of Results
+        """
+        n_mem = self.state.shape[0]
+        phase_paths = []
+        for i, (steps, history) in enumerate(paths):
+            if record and history:
+                idx = np.concatenate([h[0] for h in history])
+                states = np.concatenate([h[1] for h in history])
+                order = np.argsort(idx, kind="stable")
+                phase_paths.append(np.split(states[order], np.cumsum(steps)[:-1]))
+            else:
+                phase_paths.append([np.array([[pos_final[m, i], vel_final[m, i]]]) for m in range(n_mem)])
+        members = []
+        for m in range(n_mem):
+            res = Results()
+            start = 0.0
+            time = [np.array([0.0])]
+            state = [self.state[m].reshape((1, 2))]
+            for i in range(self.n):
+                y = phase_paths[i][m]
+                if record:
+                    t = np.arange(y.shape[0]) * self.dt[m, i]
+                else:
+                    t = np.array([time_final[m, i + 1]])
+                res.path.append(y)
+                res.pos.append(y[:, 0])
+                res.vel.append(y[:, 1])
+                res.pos_final.append(pos_final[m, i])
+                res.vel_final.append(vel_final[m, i])
+                res.time.append(t)
+                res.time_final.append(time_final[m, i + 1])
+                res.ke.append(ke[m, i])
+                time.append(t + start)
+                state.append(y)
+                start = time[-1][-1]
+            state = np.concatenate(state)
+            res.path.insert(0, state)
+            res.time.insert(0, np.concatenate(time))
+            res.time_final.insert(0, time_final[m, 0])
+            res.pos.insert(0, state[:, 0])
+            res.vel.insert(0, state[:, 1])
+            members.append(res)
+        return members
@@ -0,0 +1,106 @@
+"""
+Description: The TrajectoryIndex class answers lookups on a recorded trajectory without scanning it: the state at a
+time, the time at an altitude, and a min/max decimation of any part of the trajectory for plotting.
+
+Details: The times of a trajectory increase and, since the sections only descend, the altitudes decrease, so both
+lookups are a binary search followed by a linear blend between the two neighbouring rows. The decimation uses a pyramid
+of the rows holding the minimum and maximum of every column over blocks of factor**level rows, built once. A decimated
+range picks the finest level with at most (points - 2) // 2 blocks and returns the ends of the range and the minimum
+and maximum rows of each block in order, so peaks are kept and the number of points returned does not depend on the
+length of the run. When even that is more than the requested number of points, the rows are evenly subsampled.
+"""
+import numpy as np
+
+
+class TrajectoryIndex(object):
+    def __init__(self, time, state, factor=4, pos=0):
+        """
+        :param time: (m, ) ndarray of increasing times
+        :param state: (m, n_state) ndarray of state vectors
+        :param factor: default 4, number of blocks of a level in each block of the next level
+        :param pos: index of the altitude in the state vector
+        """
+        self.time = np.asarray(time)
+        self.state = np.asarray(state)
+        self.factor = factor
+        self.pos = pos
+        self.descending = bool(np.all(np.diff(self.state[:, pos]) <= 0.0))
+        # levels[l] holds the rows of the minimum and maximum of each column over blocks of factor**(l + 1) rows
+        self.levels = []
+        m, n = self.state.shape
+        cols = np.arange(n)
+        low = high = np.broadcast_to(np.arange(m)[:, None], (m, n))
+        while len(low) > factor:
+            blocks = -(-len(low) // factor)
+            pad = blocks * factor - len(low)
+            low = np.concatenate((low, np.repeat(low[-1:], pad, axis=0))).reshape((blocks, factor, n))
+            high = np.concatenate((high, np.repeat(high[-1:], pad, axis=0))).reshape((blocks, factor, n))
+            pick = np.argmin(self.state[low, cols], axis=1)[:, None, :]
+            low = np.take_along_axis(low, pick, axis=1)[:, 0, :]
+            pick = np.argmax(self.state[high, cols], axis=1)[:, None, :]
+            high = np.take_along_axis(high, pick, axis=1)[:, 0, :]
+            self.levels.append((low, high))
+
+    def at_time(self, t):
+        """
+        State vectors at some times, linearly interpolated between the recorded rows
+        :param t: time or ndarray of times
+        :return: ndarray of state vectors with the shape of t followed by n_state, nan outside the trajectory
+        """
+        t = np.asarray(t, dtype=float)
+        j = np.clip(np.searchsorted(self.time, t, side="right"), 1, len(self.time) - 1)
+        t_a, t_b = self.time[j - 1], self.time[j]
+        span = t_b - t_a
+        w = np.clip(np.divide(t - t_a, span, out=np.zeros_like(span, dtype=float), where=span > 0.0), 0.0, 1.0)
+        out = self.state[j - 1] * (1.0 - w)[..., None] + self.state[j] * w[..., None]
+        out[(t < self.time[0]) | (t > self.time[-1])] = np.nan
+        return out
+
+    def at_altitude(self, h):
+        """
+        Times the trajectory reaches some altitudes, linearly interpolated between the recorded rows
+        :param h: altitude or ndarray of altitudes
+        :return: ndarray of times with the shape of h, nan outside the trajectory
+        """
+        assert self.descending, "Lookups by altitude need an altitude that only decreases"
+        h = np.asarray(h, dtype=float)
+        r = self.state[:, self.pos]
+        # first row at or below each altitude, the altitudes are searched as increasing depths
+        j = np.clip(np.searchsorted(-r, -h, side="left"), 1, len(r) - 1)
+        r_a, r_b = r[j - 1], r[j]
+        drop = r_a - r_b
+        w = np.clip(np.divide(r_a - h, drop, out=np.zeros_like(drop, dtype=float), where=drop > 0.0), 0.0, 1.0)
+        out = self.time[j - 1] * (1.0 - w) + self.time[j] * w
+        out = np.where((h > r[0]) | (h < r[-1]), np.nan, out)
+        return out
+
+    def lod(self, column=None, t0=None, t1=None, points=2000):
+        """
+        Min/max decimation of a time range of one column of the state vector
+        :param column: index of the column, by default the altitude
+        :param t0: start of the time range, by default the start of the trajectory
+        :param t1: end of the time range, by default the end of the trajectory
+        :param points: default 2000, largest number of points returned, at least 1
+        :return: ndarrays of the times and values of the decimated rows
+        """
+        assert points >= 1, "\"points\" must be at least 1"
+        column = self.pos if column is None else column
+        i0 = 0 if t0 is None else int(np.searchsorted(self.time, t0, side="left"))
+        i1 = len(self.time) if t1 is None else int(np.searchsorted(self.time, t1, side="right"))
+        rows = np.arange(i0, i1)
+        # each block gives its minimum and maximum row, the ends of the range are the other two
+        blocks = max(1, (points - 2) // 2)
+        if i1 - i0 > points and self.levels:
+            level = 0
+            size = self.factor
+            while level < len(self.levels) - 1 and (i1 - 1) // size - i0 // size + 1 > blocks:
+                level += 1
+                size *= self.factor
+            low, high = self.levels[level]
+            b0, b1 = i0 // size, (i1 - 1) // size + 1
+            rows = np.unique(np.concatenate(([i0, i1 - 1], low[b0:b1, column], high[b0:b1, column])))
+            rows = rows[(rows >= i0) & (rows < i1)]
+        if len(rows) > points:
+            # fewer points than the minimum and maximum of one block, or more blocks than the coarsest level holds
+            rows = rows[np.linspace(0, len(rows) - 1, points).round().astype(int)]
+        return self.time[rows], self.state[rows, column]
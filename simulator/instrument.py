@@ -0,0 +1,111 @@
+"""
+Description: Opt-in instrumentation of the integrators. An Instrument attached to a Mission or an Ensemble records for
+every phase the integration steps, the evaluations of the equations of motion, the rejected steps of the adaptive
+integrator, the wall time and optionally the peak memory allocated, and passes each record to hook callbacks.
+
+Details: The engines only check whether an Instrument is attached once per phase, never inside the integration loop, so
+leaving the checks in for production runs costs nothing when no Instrument is attached. The step counts come from the
+loop counters the engines keep anyway. A hook is a function of (event, record) called with event "start" before a phase
+is integrated and "end" after it, for example to start and stop a profiler around the phases of interest. Allocations
+are measured with tracemalloc, which slows the integration down, so they are only recorded with memory=True, and an
+Instrument that starts tracemalloc stops it again at the end of the phase, so later runs are not slowed down.
+"""
+import time
+import tracemalloc
+
+fields = ["steps", "rhs_evals", "rejected", "wall", "alloc_peak"]
+
+
+class Instrument(object):
+    def __init__(self, memory=False, hooks=()):
+        """
+        :param memory: default False, flag to record the peak memory allocated during each phase with tracemalloc
+        :param hooks: functions of (event, record) called at the start and end of each phase
+        """
+        self.memory = memory
+        self.hooks = list(hooks)
+        self.records = []
+        self.open = 0
+        self.tracing = False
+
+    def start(self, source, phase, **info):
+        """
+        Called by an engine before it integrates a phase
+        :param source: name of the engine, for example mission or ensemble
+        :param phase: index of the phase
+        :param info: extra entries of the record, for example the title of the mission
+        :return: record dict to hand back to stop()
+        """
+        record = {"source": source, "phase": phase}
+        record.update(info)
+        for hook in self.hooks:
+            hook("start", record)
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.tracing = True
+            self.open += 1
+            tracemalloc.reset_peak()
+            record["alloc_start"] = tracemalloc.get_traced_memory()[0]
+        record["wall"] = time.perf_counter()
+        return record
+
+    def stop(self, record, steps, rhs_evals, rejected=0, cached=False):
+        """
+        Called by an engine after it integrated a phase
+        :param record: record dict returned by start()
+        :param steps: number of integration steps
+        :param rhs_evals: number of evaluations of the equations of motion
+        :param rejected: number of rejected steps
+        :param cached: flag for a phase that was copied from a cache instead of integrated
+        :return: None
+        """
+        record["wall"] = time.perf_counter() - record["wall"]
+        if self.memory:
+            record["alloc_peak"] = tracemalloc.get_traced_memory()[1] - record.pop("alloc_start")
+            self.open -= 1
+            if self.tracing and not self.open:
+                tracemalloc.stop()
+                self.tracing = False
+        record.update(steps=int(steps), rhs_evals=int(rhs_evals), rejected=int(rejected), cached=cached)
+        self.records.append(record)
+        for hook in self.hooks:
+            hook("end", record)
+
+    def clear(self):
+        """
+        Removes every record
+        :return: None
+        """
+        self.records = []
+
+    def summary(self):
+        """
+        Totals over the records of each engine and phase
+        :return: dict of {(source, phase): {field: total}} with the number of runs of the phase in "runs"
+        """
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault((record["source"], record["phase"]), {"runs": 0, "cached": 0})
+            total["runs"] += 1
+            total["cached"] += int(record["cached"])
+            for name in fields:
+                if name in record:
+                    total[name] = total.get(name, 0) + record[name]
+        return totals
+
+    def report(self, dec=3):
+        """
+        Table of the summary in the layout of the Mission display tables
+        :param dec: default 3, number of decimals of the wall time (ms)
+        :return: str
+        """
+        columns = ["runs", "cached", "steps", "rhs evals", "rejected", "wall (ms)", "alloc (kB)"]
+        row_format = "{:>14}" + "{:>12}" * len(columns)
+        lines = ["Integrator Instrumentation", row_format.format("", *columns)]
+        for (source, phase), total in sorted(self.summary().items(), key=lambda item: (item[0][0], item[0][1])):
+            alloc = round(total["alloc_peak"] / 1e3, 1) if "alloc_peak" in total else ""
+            lines.append(row_format.format("{0} {1}".format(source, phase + 1), total["runs"], total["cached"],
+                                           total["steps"], total["rhs_evals"], total["rejected"],
+                                           round(1e3 * total["wall"], dec), alloc))
+        return "\n".join(lines)
@@ -0,0 +1,131 @@
+"""
+Description: Adaptive step integration for a single phase of descent. The Dormand-Prince 5(4) embedded Runge-Kutta pair
+adjusts the time step to meet the requested tolerances, taking long steps once the descent settles near terminal
+velocity.
+
+Details: The breaking condition is treated as an event. When a step crosses the breaking altitude the crossing is found
+with a root solve on the 4th order continuous extension of the step, so the phase ends exactly on the breaking altitude
+instead of up to one time step past it.
+"""
+import numpy as np
+
+C = np.array([0.0, 1.0 / 5.0, 3.0 / 10.0, 4.0 / 5.0, 8.0 / 9.0, 1.0])
+A = [np.array([]),
+     np.array([1.0 / 5.0]),
+     np.array([3.0 / 40.0, 9.0 / 40.0]),
+     np.array([44.0 / 45.0, -56.0 / 15.0, 32.0 / 9.0]),
+     np.array([19372.0 / 6561.0, -25360.0 / 2187.0, 64448.0 / 6561.0, -212.0 / 729.0]),
+     np.array([9017.0 / 3168.0, -355.0 / 33.0, 46732.0 / 5247.0, 49.0 / 176.0, -5103.0 / 18656.0])]
+B = np.array([35.0 / 384.0, 0.0, 500.0 / 1113.0, 125.0 / 192.0, -2187.0 / 6784.0, 11.0 / 84.0])
+E = np.array([-71.0 / 57600.0, 0.0, 71.0 / 16695.0, -71.0 / 1920.0, 17253.0 / 339200.0, -22.0 / 525.0, 1.0 / 40.0])
+P = np.array([[1.0, -8048581381.0 / 2820520608.0, 8663915743.0 / 2820520608.0, -12715105075.0 / 11282082432.0],
+              [0.0, 0.0, 0.0, 0.0],
+              [0.0, 131558114200.0 / 32700410799.0, -68118460800.0 / 10900136933.0,
+               87487479700.0 / 32700410799.0],
+              [0.0, -1754552775.0 / 470086768.0, 14199869525.0 / 1410260304.0, -10690763975.0 / 1880347072.0],
+              [0.0, 127303824393.0 / 49829197408.0, -318862633887.0 / 49829197408.0,
+               701980252875.0 / 199316789632.0],
+              [0.0, -282668133.0 / 205662961.0, 2019193451.0 / 616988883.0, -1453857185.0 / 822651844.0],
+              [0.0, 40617522.0 / 29380423.0, -110615467.0 / 29380423.0, 69997945.0 / 29380423.0]])
+
+
+def dense(y, h, q, theta):
+    """
+    Evaluates the continuous extension of a Dormand-Prince step
+    :param y: state vector at the start of the step
+    :param h: step size
+    :param q: (n, 4) interpolation coefficients of the step
+    :param theta: fraction of the step, 0 to 1
+    :return: state vector at t + theta*h
+    """
+    return y + h * q.dot(theta ** np.arange(1, 5))
+
+
+def locate(y, h, q, event, tol=1e-12):
+    """
+    Finds the fraction of a step where the event function crosses zero using the Illinois variant of regula falsi on
+    the continuous extension of the step. The event must be positive at the start of the step and not positive at the
+    end of it.
+    :param y: state vector at the start of the step
+    :param h: step size
+    :param q: (n, 4) interpolation coefficients of the step
+    :param event: function of the state vector, the phase ends when it reaches zero
+    :param tol: tolerance on the step fraction
+    :return: step fraction of the crossing
+    """
+    a, b = 0.0, 1.0
+    fa, fb = event(y), event(dense(y, h, q, 1.0))
+    side = 0
+    theta = b
+    while b - a > tol:
+        theta = (a * fb - b * fa) / (fb - fa)
+        f = event(dense(y, h, q, theta))
+        if f > 0.0:
+            a, fa = theta, f
+            if side == -1:
+                fb *= 0.5
+            side = -1
+        else:
+            b, fb = theta, f
+            if side == 1:
+                fa *= 0.5
+            side = 1
+        if f == 0.0:
+            break
+    return theta
+
+
+def dopri45(f, y0, h0, event, rtol=1e-6, atol=1e-6, max_factor=10.0, min_factor=0.2, safety=0.9):
+    """
+    Integrates the equations of motion with the Dormand-Prince 5(4) pair until the event function reaches zero
+    :param f: equations of motion, function of the state vector returning its time derivative
+    :param y0: initial state vector
+    :param h0: initial step size
+    :param event: function of the state vector, integration stops when it reaches zero
+    :param rtol: relative tolerance
+    :param atol: absolute tolerance
+    :param max_factor: largest growth of the step size between steps
+    :param min_factor: largest reduction of the step size between steps
+    :param safety: safety factor of the step size controller
+    :return:
+        results: ndarray of the state vector after every accepted step, the last one on the event
+        time: ndarray of the time since the start of the phase for every state vector
+        n_eval: number of evaluations of the equations of motion
+        n_reject: number of rejected steps
+    """
+    y = np.asarray(y0, dtype=float).flatten()
+    t = 0.0
+    h = h0
+    k = np.empty((7, y.size))
+    k[0] = np.asarray(f(y), dtype=float).flatten()
+    n_eval = 1
+    n_reject = 0
+    results = []
+    time = []
+    while event(y) > 0.0:
+        for s in range(1, 6):
+            k[s] = np.asarray(f(y + h * A[s].dot(k[:s])), dtype=float).flatten()
+        y_new = y + h * B.dot(k[:6])
+        k[6] = np.asarray(f(y_new), dtype=float).flatten()
+        n_eval += 6
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        err = np.sqrt(np.mean((h * E.dot(k) / scale) ** 2))
+        if err > 1.0:
+            h *= max(min_factor, safety * err ** -0.2)
+            n_reject += 1
+            continue
+        if event(y_new) <= 0.0:
+            q = k.T.dot(P)
+            theta = locate(y, h, q, event)
+            y = dense(y, h, q, theta)
+            t += theta * h
+            results.append(y)
+            time.append(t)
+            break
+        y = y_new
+        t += h
+        k[0] = k[6]
+        results.append(y)
+        time.append(t)
+        h *= min(max_factor, safety * err ** -0.2) if err > 0.0 else max_factor
+    return np.asarray(results), np.asarray(time), n_eval, n_reject
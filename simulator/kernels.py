@@ -0,0 +1,164 @@
+"""
+Description: Closed form equations of motion for a falling section with quadratic drag and constant gravity. These are
+the same equations that used to be derived symbolically for every phase, written out by hand so they work directly on
+floats and ndarrays.
+
+Details: With a constant density the drag acceleration only depends on the velocity through k*v**2 where
+k = 0.5*rho*S*Cd/m, so every kernel is defined by that single constant. With an atmosphere model the density is looked
+up at the altitude of every stage and k = c*rho(r) with c = 0.5*S*Cd/m. drag_rk4 and drag_rk4_density take one
+Runge-Kutta 4 step and work on plain floats (Mission) as well as on ndarrays of many states (Ensemble) without building
+any intermediate state vectors. drag_rk4_tangent carries the forward sensitivity equations of the same step alongside it,
+which is Runge-Kutta 4 applied to the variational equations and so the exact derivative of the step.
+"""
+import numpy as np
+from simulator.atmosphere import Constant
+
+g = 32.17405
+rho = 0.0023769
+
+
+def drag_constant(mass, area, c_d, rho=rho):
+    """
+    Collects the constant part of the drag acceleration so that dv/dt = k*v**2 - g
+    :param mass: mass of the falling section
+    :param area: reference area of the parachute
+    :param c_d: drag coefficient of the parachute
+    :param rho: air density, default is sea level. 1.0 gives the drag constant per unit density.
+    :return: k
+    """
+    return c_d * 0.5 * rho * area / mass
+
+
+def drag_rk4(r, v, k, h):
+    """
+    Runge-Kutta 4 step of the drag plus gravity equations of motion
+    :param r: altitude, float or ndarray
+    :param v: velocity, float or ndarray
+    :param k: drag constant, float or ndarray
+    :param h: time step, float or ndarray
+    :return: altitude and velocity after one time step
+    """
+    k1r = v * h
+    k1v = (k * v * v - g) * h
+    v2 = v + 0.5 * k1v
+    k2r = v2 * h
+    k2v = (k * v2 * v2 - g) * h
+    v3 = v + 0.5 * k2v
+    k3r = v3 * h
+    k3v = (k * v3 * v3 - g) * h
+    v4 = v + k3v
+    k4r = v4 * h
+    k4v = (k * v4 * v4 - g) * h
+    return r + (k1r + 2.0 * k2r + 2.0 * k3r + k4r) / 6.0, v + (k1v + 2.0 * k2v + 2.0 * k3v + k4v) / 6.0
+
+
+def drag_rk4_tangent(r, v, k, h, sr, sv, sk):
+    """
+    Runge-Kutta 4 step of the drag plus gravity equations of motion together with their forward sensitivity equations.
+    The tangent is the derivative of the state along some parameter direction. With a constant density the velocity
+    does not depend on the altitude, so the altitude tangent of the next step is only needed from the velocity tangent.
+    :param r: altitude, float
+    :param v: velocity, float
+    :param k: drag constant, float
+    :param h: time step, float
+    :param sr: derivative of the altitude, float or ndarray of several directions
+    :param sv: derivative of the velocity along the same directions
+    :param sk: derivative of k along the same directions
+    :return: altitude, velocity and their derivatives after one time step
+    """
+    k1r = v * h
+    k1v = (k * v * v - g) * h
+    t1r = sv * h
+    t1v = (2.0 * k * v * sv + sk * v * v) * h
+    v2 = v + 0.5 * k1v
+    s2 = sv + 0.5 * t1v
+    k2r = v2 * h
+    k2v = (k * v2 * v2 - g) * h
+    t2r = s2 * h
+    t2v = (2.0 * k * v2 * s2 + sk * v2 * v2) * h
+    v3 = v + 0.5 * k2v
+    s3 = sv + 0.5 * t2v
+    k3r = v3 * h
+    k3v = (k * v3 * v3 - g) * h
+    t3r = s3 * h
+    t3v = (2.0 * k * v3 * s3 + sk * v3 * v3) * h
+    v4 = v + k3v
+    s4 = sv + t3v
+    k4r = v4 * h
+    k4v = (k * v4 * v4 - g) * h
+    t4r = s4 * h
+    t4v = (2.0 * k * v4 * s4 + sk * v4 * v4) * h
+    return (r + (k1r + 2.0 * k2r + 2.0 * k3r + k4r) / 6.0, v + (k1v + 2.0 * k2v + 2.0 * k3v + k4v) / 6.0,
+            sr + (t1r + 2.0 * t2r + 2.0 * t3r + t4r) / 6.0, sv + (t1v + 2.0 * t2v + 2.0 * t3v + t4v) / 6.0)
+
+
+def drag_rk4_density(r, v, c, h, density):
+    """
+    Runge-Kutta 4 step of the drag plus gravity equations of motion with an air density that changes with altitude
+    :param r: altitude, float or ndarray
+    :param v: velocity, float or ndarray
+    :param c: drag constant per unit density, float or ndarray
+    :param h: time step, float or ndarray
+    :param density: function of the altitude returning the air density, see atmosphere.py
+    :return: altitude and velocity after one time step
+    """
+    k1r = v * h
+    k1v = (c * density(r) * v * v - g) * h
+    v2 = v + 0.5 * k1v
+    k2r = v2 * h
+    k2v = (c * density(r + 0.5 * k1r) * v2 * v2 - g) * h
+    v3 = v + 0.5 * k2v
+    k3r = v3 * h
+    k3v = (c * density(r + 0.5 * k2r) * v3 * v3 - g) * h
+    v4 = v + k3v
+    k4r = v4 * h
+    k4v = (c * density(r + k3r) * v4 * v4 - g) * h
+    return r + (k1r + 2.0 * k2r + 2.0 * k3r + k4r) / 6.0, v + (k1v + 2.0 * k2v + 2.0 * k3v + k4v) / 6.0
+
+
+class DragKernel(object):
+    def __init__(self, mass, area, c_d, atmosphere=None):
+        """
+        Equations of motion of a falling section with a given mass, area, and coefficient of drag
+        :param mass: mass of the falling section
+        :param area: reference area of the parachute
+        :param c_d: drag coefficient of the parachute
+        :param atmosphere: atmosphere model, default is the constant sea level density
+        """
+        if atmosphere is None:
+            atmosphere = Constant()
+        self.atmosphere = atmosphere
+        self.c = drag_constant(mass, area, c_d, 1.0)
+        if atmosphere.constant:
+            self.k = drag_constant(mass, area, c_d, atmosphere.rho)
+            self.density = None
+        else:
+            self.k = self.c * atmosphere.density(0.0)
+            self.density = atmosphere.density
+
+    def __call__(self, y):
+        """
+        Time derivative of the state vector
+        :param y: (2, ) state vector or (N, 2) ndarray of state vectors
+        :return: time derivative with the same shape as y
+        """
+        dy = np.empty_like(y, dtype=float)
+        dy[..., 0] = y[..., 1]
+        if self.density is None:
+            dy[..., 1] = self.k * y[..., 1] ** 2 - g
+        else:
+            dy[..., 1] = self.c * self.density(y[..., 0]) * y[..., 1] ** 2 - g
+        return dy
+
+    def step(self, y, h):
+        """
+        Runge-Kutta 4 step over the constant time step h, evaluated on floats
+        :param y: (2, ) state vector
+        :param h: time step
+        :return: (2, ) state vector after the time step
+        """
+        if self.density is None:
+            r, v = drag_rk4(float(y[0]), float(y[1]), self.k, h)
+        else:
+            r, v = drag_rk4_density(float(y[0]), float(y[1]), self.c, h, self.density)
+        return np.array((r, v))
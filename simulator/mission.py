@@ -7,12 +7,20 @@ simulation.
 Details: The numerical simulation uses a Runge-Kutta 4 integrator for the numerical simulation until one of the breaking
 conditions have been met. The breaking conditions can only be set using the state vector in the simulation. The
 simulation will save the entire run as a ndarray and has plotting capabilities to visualize the velocity and position
-over time. The simulation is currently a 1D simulation that does not take crosswind into account. ***Creating a 2D
-Simulation in the same framework would be very useful for testing non-uniform crosswinds***
+over time in plotting.py, which is only imported when a plot is made. The simulation is a 1D simulation that does not
+take crosswind into account. The drift table comes from the 3D simulation in descent3d.py, which integrates the same
+descent through wind profiles that vary with altitude.
 """
-import sympy as sy
+import copy
 import numpy as np
-import matplotlib.pyplot as plt
+from simulator import analytic, cache
+from simulator.buffer import TrajectoryBuffer
+from simulator.descent3d import Descent3D
+from simulator.index import TrajectoryIndex
+from simulator.integrators import dopri45
+from simulator.kernels import DragKernel, drag_rk4, drag_rk4_density, drag_rk4_tangent, g
+from simulator.wind import WindProfile
+from setup_files.mission_chutes import parachutes
 
 
 class Results(object):
@@ -25,37 +33,304 @@ class Results(object):
         self.pos_final = []
         self.vel_final = []
         self.time_final = []
+        self.trajectory = None
+
+    def index(self):
+        """
+        Lookup index of the trajectory of the whole mission, built on first use
+        :return: TrajectoryIndex from index.py
+        """
+        if self.trajectory is None:
+            self.trajectory = TrajectoryIndex(self.time[0], self.path[0])
+        return self.trajectory
+
+
+class Sensitivity(object):
+    def __init__(self, time_final, vel_final, ke):
+        """
+        Derivatives of the results of a mission with respect to the parameters of every phase. The parameters are the
+        drag coefficient, parachute area and mass of each phase and the breaking condition altitude of each phase, in
+        that order along the second to last axis, and the last axis is the phase of the parameter.
+        :param time_final: (n + 1, 4, n) ndarray, derivatives of the total descent time and of the time of each phase
+        :param vel_final: (n, 4, n) ndarray, derivatives of the velocity at the end of each phase
+        :param ke: (n, 4, n) ndarray, or (n, sections, 4, n) for a split mission, derivatives of the kinetic energy at
+        the end of each phase
+        """
+        self.params = ["cd", "S", "mass", "bc"]
+        self.time_final = time_final
+        self.vel_final = vel_final
+        self.ke = ke
+
+    def landing(self, field="ke"):
+        """
+        Derivatives at the end of the last phase
+        :param field: ke, vel_final or time_final for the total descent time
+        :return: dict of {param: ndarray of the derivative with respect to the parameter of each phase}
+        """
+        data = getattr(self, field)[0 if field == "time_final" else -1]
+        return {name: data[..., j, :] for j, name in enumerate(self.params)}
 
 
 class Mission(object):
-    def __init__(self, mission):
+    def __init__(self, mission, use_cache=True, instrument=None):
         """
         This class is given mission parameters and initial conditions of the simulation to set up the equations of
         motion. The equations of motion are then evaluated using numerical integration until breaking conditions
         are achieved. The method run_mission() is called after initialization of the Mission class.
         :param mission: list of initial parameters that is returned by running the function in XXX_setup.py.
+        :param use_cache: default True, flag to reuse equations of motion and phase results from cache.py and the
+        phases of the previous run that did not change
+        :param instrument: optional Instrument from instrument.py that records the cost of every phase
         """
         self.__as = 0
         self.__vs = 1
         self.__equ = []
+        self.__keys = []
+        self.use_cache = use_cache
+        self.instrument = instrument
+        self.__count = (0, 0, 0)
+        self.__hit = False
         self.__state = mission.initial_state
         self.__n = mission.n
         self.__split = None
         self.title = mission.title
         self.dt = mission.dt
+        self.integrator = mission.integrator
+        self.rtol = mission.rtol
+        self.atol = mission.atol
         self.time_lim = mission.max_time
         self.ke_lim = mission.max_ke
         self.phase = mission.bc
         self.mass = mission.masses
+        self.setup = mission
+        self.__memo = [None] * self.__n
+        self.recomputed = []
         for i in range(self.__n):
-            self.__equ.append(self.make_equ(mission.masses[i], mission.chutes[i].S, mission.chutes[i].cd))
+            self.__equ.append(None)
+            self.__keys.append(None)
+            self.__build(i)
         self.results = Results()
+        self.sensitivity = None
 
-    def run_mission(self, split=None):
+    def run_mission(self, split=None, record=1):
         """
         Evaluates all phases of the mission iteratively. The mission will run until the breaking conditions have been
         met which is defined as part of the classes initialization. The integration can be cut into multiple phases with
-        the final state vector is the initial state vector for the next phase.
+        the final state vector is the initial state vector for the next phase. Each phase is integrated by steps(), the
+        same generator stream() reads, straight into the rows of one trajectory buffer. A phase whose fingerprint matches
+        the previous run is copied from that run instead, so after set_phase() only the changed phase and the phases
+        after it are integrated again.
+        :param split: list of ndarrays of the section masses for each phase
+        :param record: default 1, record every k-th step of the integration or "endpoints" to only record the end of
+        each phase. The end of each phase is always recorded.
+        :return:
+        """
+        if record == "endpoints":
+            every = 0
+        else:
+            assert isinstance(record, int) and record > 0, "\"record\" must be a positive int or \"endpoints\""
+            every = record
+        self.recomputed = []
+        return self.__run(split, lambda y, i, buf: self.__resume(y, i, buf, every), every)
+
+    def set_phase(self, phase, chute=None, mass=None, dt=None, bc=None):
+        """
+        Changes the parameters of one phase. The setup given to the class is not modified, the Mission keeps its own
+        copy. The next run_mission() reuses every phase before the changed one.
+        :param phase: index of the phase
+        :param chute: name of a parachute in mission_chutes.py or a Parachute
+        :param mass: mass of the falling section
+        :param dt: time step of the phase
+        :param bc: breaking condition altitude of the phase
+        :return: None
+        """
+        setup = copy.copy(self.setup)
+        setup.chutes, setup.masses = list(setup.chutes), list(setup.masses)
+        setup.dt, setup.bc = list(setup.dt), list(setup.bc)
+        if chute is not None:
+            setup.chutes[phase] = parachutes[chute] if isinstance(chute, str) else chute
+        if mass is not None:
+            setup.masses[phase] = mass
+        if dt is not None:
+            setup.dt[phase] = dt
+        if bc is not None:
+            setup.bc[phase] = bc
+        self.setup = setup
+        self.mass, self.dt, self.phase = setup.masses, setup.dt, setup.bc
+        self.__build(phase)
+
+    def fingerprint(self, y_i, phase, dt=None, every=1):
+        """
+        Everything that determines the integrated trajectory of a phase
+        :param y_i: initial state vector
+        :param phase: index of the phase
+        :param dt: time step, by default the time step of the phase
+        :param every: record every k-th step, 0 for only the end of the phase
+        :return: hashable tuple
+        """
+        dt = self.dt[phase] if dt is None else dt
+        return (tuple(float(x) for x in y_i), self.__keys[phase], self.integrator[phase], self.rtol, self.atol,
+                float(dt), float(self.phase[phase]), every)
+
+    def __build(self, phase):
+        """
+        Builds or fetches from the cache the equations of motion of a phase
+        :param phase: index of the phase
+        :return: None
+        """
+        setup = self.setup
+        chute = setup.chutes[phase]
+        key = (float(setup.masses[phase]), float(chute.S), float(chute.cd), setup.forces[phase],
+               setup.atmosphere.key)
+        equ = cache.equations.get(key) if self.use_cache else None
+        if equ is None:
+            equ = self.make_equ(setup.masses[phase], chute.S, chute.cd, setup.forces[phase], setup.atmosphere)
+            if self.use_cache:
+                cache.equations.put(key, equ)
+        self.__equ[phase] = equ
+        self.__keys[phase] = key
+
+    def __resume(self, y_i, phase, buf, every):
+        """
+        Writes a phase into the trajectory buffer, copied from the previous run if its fingerprint did not change and
+        integrated otherwise. The memo of the previous run is kept besides cache.phases on purpose: it holds views of
+        the previous trajectory without a copy and is never evicted, so the unchanged phases are reused after
+        set_phase() however long they are, while cache.phases only shares phases small enough to copy between Missions.
+        :param y_i: initial state vector
+        :param phase: index of the phase
+        :param buf: TrajectoryBuffer
+        :param every: record every k-th step, 0 for only the end of the phase
+        :return: None
+        """
+        fingerprint = self.fingerprint(y_i, phase, every=every)
+        memo = self.__memo[phase]
+        if self.use_cache and memo is not None and memo[0] == fingerprint:
+            buf.extend(buf.last()[0] + memo[2], memo[1])
+            if self.instrument is not None:
+                self.instrument.stop(self.instrument.start("mission", phase, title=self.title), 0, 0, cached=True)
+            return
+        results, time = self.sim(y_i, self.dt[phase], self.__equ[phase], phase, buf, every)
+        if not self.__hit:
+            self.recomputed.append(phase)
+        if self.use_cache:
+            self.__memo[phase] = (fingerprint, results, time)
+
+    def run_sensitivity(self, split=None, record=1):
+        """
+        Evaluates all phases like run_mission() while carrying the forward sensitivity equations alongside the
+        Runge-Kutta 4 step, so one run gives both the results and their derivatives with respect to the drag
+        coefficient, parachute area, mass and breaking condition of every phase. The end of every phase is corrected
+        to the time the breaking condition is met exactly, so the derivatives do not jump with the number of steps the
+        way finite differences of run_mission() do. Only the drag plus gravity model with a constant density is
+        supported.
+        :param split: list of ndarrays of the section masses for each phase, same as run_mission()
+        :param record: default 1, record every k-th step of the integration or "endpoints", same as run_mission()
+        :return: Sensitivity
+        """
+        if record == "endpoints":
+            every = 0
+        else:
+            assert isinstance(record, int) and record > 0, "\"record\" must be a positive int or \"endpoints\""
+            every = record
+        n = self.__n
+        # derivatives of the altitude and velocity with respect to the drag constant and breaking condition of every
+        # phase, updated at the end of each phase
+        tangent = [np.zeros(2 * n), np.zeros(2 * n)]
+        d_time = np.zeros((n + 1, 2 * n))
+        d_vel = np.zeros((n, 2 * n))
+
+        def phase_solver(y, i, buf):
+            tangent[0], tangent[1], d_time[i + 1] = self.__tangent(y, i, buf, every, *tangent)
+            d_vel[i] = tangent[1]
+        self.recomputed = []
+        self.__run(split, phase_solver, every)
+        d_time[0] = d_time[1:].sum(axis=0)
+        mass = self.mass if split is None else split
+        vel = np.array(self.results.vel_final)
+        d_ke = np.array([np.multiply.outer(mass[i] * vel[i], d_vel[i]) for i in range(n)])
+        k = np.array([self.__equ[i].k for i in range(n)])
+        cd = np.array([float(chute.cd) for chute in self.setup.chutes])
+        area = np.array([float(chute.S) for chute in self.setup.chutes])
+        m = np.array([float(x) for x in self.mass])
+
+        def params(d):
+            d_k, d_bc = d[..., :n], d[..., n:]
+            return np.stack([d_k * k / cd, d_k * k / area, -d_k * k / m, d_bc], axis=-2)
+        d_ke = params(d_ke)
+        if split is None:
+            # the kinetic energy also changes with the mass directly, not only through the drag constant
+            d_ke[np.arange(n), 2, np.arange(n)] += 0.5 * vel ** 2
+        self.sensitivity = Sensitivity(params(d_time), params(d_vel), d_ke)
+        return self.sensitivity
+
+    def __tangent(self, y_i, phase, buf, every, d_r, d_v):
+        """
+        Integrates a phase with its forward sensitivity equations and writes the state vectors into the buffer
+        :param y_i: initial state vector
+        :param phase: index of the phase
+        :param buf: TrajectoryBuffer
+        :param every: record every k-th step, 0 for only the end of the phase
+        :param d_r: ndarray of the derivatives of the initial altitude
+        :param d_v: ndarray of the derivatives of the initial velocity
+        :return: derivatives of the altitude and velocity at the end of the phase and of the time of the phase
+        """
+        func = self.__equ[phase]
+        assert isinstance(func, DragKernel) and func.density is None and self.integrator[phase] == "rk4", \
+            "Sensitivities need the rk4 integrator, the drag plus gravity model and a constant density"
+        n = self.__n
+        k, bc, dt = func.k, self.phase[phase], self.dt[phase]
+        t0 = buf.last()[0]
+        r, v = float(y_i[self.__as]), float(y_i[self.__vs])
+        record = None if self.instrument is None else self.instrument.start("sensitivity", phase, title=self.title)
+        # tangents of a unit change of the initial velocity and of a unit change of the drag constant
+        a_r, a_v = 0.0, 1.0
+        k_r, k_v = 0.0, 0.0
+        it = 0
+        while r > bc:
+            it += 1
+            a_r, a_v = drag_rk4_tangent(r, v, k, dt, a_r, a_v, 0.0)[2:]
+            r, v, k_r, k_v = drag_rk4_tangent(r, v, k, dt, k_r, k_v, 1.0)
+            if every and it % every == 0:
+                buf.append(t0 + (it - 1) * dt, (r, v))
+        if it and (not every or it % every):
+            buf.append(t0 + (it - 1) * dt, (r, v))
+        if record is not None:
+            self.instrument.stop(record, it, 8 * it)
+        if not it:
+            return d_r, d_v, np.zeros(2 * n)
+        # with a constant density the altitude does not change the velocity
+        d_r = d_r + a_r * d_v
+        d_v = a_v * d_v
+        d_r[phase] += k_r
+        d_v[phase] += k_v
+        # the phase ends when r = bc, which moves with the parameters
+        d_time = -d_r / v
+        d_time[n + phase] += 1.0 / v
+        return d_r + v * d_time, d_v + (k * v * v - g) * d_time, d_time
+
+    def run_analytic(self, split=None, t_grid=None):
+        """
+        Evaluates all phases of the mission with the closed form solution of the drag plus gravity equations of motion
+        instead of numerical integration. The results are stored in the same way as run_mission() so every display
+        table works with either one.
+        :param split: list of ndarrays of the section masses for each phase, same as run_mission()
+        :param t_grid: optional ndarray of mission times to sample the trajectory at. By default only the end of each
+        phase is stored.
+        :return:
+        """
+        if t_grid is None:
+            return self.__run(split, lambda y, i, buf: self.analytic(y, i, None, buf), 0)
+        t_grid = np.asarray(t_grid, dtype=float)
+        return self.__run(split, lambda y, i, buf: self.analytic(y, i, t_grid - buf.last()[0], buf), 1)
+
+    def __run(self, split, phase_solver, every):
+        """
+        Runs every phase with the given solver and stores the results. All phases are written into one trajectory
+        buffer and the results are views into it.
+        :param split: list of ndarrays of the section masses for each phase
+        :param phase_solver: function of the initial state vector, phase index and trajectory buffer that writes the
+        state vectors of the phase into the buffer
+        :param every: record every k-th step, 0 for only the end of each phase
         :return:
         """
         if split is None:
@@ -67,12 +342,21 @@ class Mission(object):
             assert len(split) == self.__n, "List must have the same length as the number of phases"
             mass = split
             self.__split = split
+        self.results = Results()
         y = self.__state
-        time = np.array([0])
-        state = y
-        state = state.reshape((1, len(y)))
+        buf = TrajectoryBuffer(len(y), 1 + self.estimate_rows(y, every))
+        buf.append(0.0, y)
+        bounds = []
+        for i in range(self.__n):
+            start = buf.size
+            phase_solver(y, i, buf)
+            bounds.append(start)
+            y = buf.last()[1]
+        bounds.append(buf.size)
+        state, time = buf.view()
         for i in range(self.__n):
-            y, t = self.sim(y, self.dt[i], self.__equ[i], i)
+            y = state[bounds[i]:bounds[i + 1]]
+            t = time[bounds[i]:bounds[i + 1]] - time[bounds[i] - 1]
             self.results.path.append(y)
             self.results.pos.append(y[:, self.__as])
             self.results.vel.append(y[:, self.__vs])
@@ -80,62 +364,243 @@ class Mission(object):
             self.results.vel_final.append(y[-1, self.__vs])
             self.results.time.append(t)
             self.results.time_final.append(t[-1])
-            self.results.ke.append(self.kinetic_energy(self.results.path[i][-1, self.__vs], mass[i]))
-            time = np.append(time, t + time[-1])
-            state = np.append(state, y, axis=0)
-            y = y[-1, :]
+            self.results.ke.append(self.kinetic_energy(y[-1, self.__vs], mass[i]))
         self.results.path.insert(0, state)
         self.results.time.insert(0, time)
         self.results.time_final.insert(0, time[-1])
-        self.results.pos.insert(0, self.results.path[0][:, self.__as])
-        self.results.vel.insert(0, self.results.path[0][:, self.__vs])
+        self.results.pos.insert(0, state[:, self.__as])
+        self.results.vel.insert(0, state[:, self.__vs])
         return state, time
 
-    def sim(self, y_i, dt, func, phase):
+    def estimate_rows(self, y_i, every=1):
+        """
+        Estimates the number of state vectors a run will record so the trajectory buffer can be preallocated. The
+        length of the fixed step phases comes from the closed form solution of the descent.
+        :param y_i: initial state vector
+        :param every: record every k-th step, 0 for only the end of each phase
+        :return: estimated number of rows
+        """
+        rows = 0
+        r, v = y_i[self.__as], y_i[self.__vs]
+        for i in range(self.__n):
+            func = self.__equ[i]
+            if not every:
+                rows += 1
+            elif self.integrator[i] == "rk4" and isinstance(func, DragKernel) and v <= 0.0:
+                t_end, v = analytic.phase_end(r, v, func.k, self.phase[i])
+                rows += int(t_end / self.dt[i] + 2) // every + 1
+            else:
+                rows += 1024
+            r = min(r, self.phase[i])
+        return rows
+
+    def analytic(self, y_i, phase, t_sample=None, buf=None):
         """
-        Evaluates the equations of motion using numerical integration. The integration method chosen is the
-        Runge-Kutta 4 integrator.
+        Evaluates a phase with the closed form solution for quadratic drag with constant density and gravity
         :param y_i: initial state vector
-        :param dt: time step for that phase
+        :param phase: The current phase that is being run
+        :param t_sample: optional ndarray of times since the start of the phase to sample the trajectory at
+        :param buf: TrajectoryBuffer to write the state vectors into, by default a new one
+        :return:
+            results: ndarray of the sampled state vectors, the last one on the breaking condition.
+            time: ndarray of the time which each state vector correlates with.
+        """
+        func = self.__equ[phase]
+        assert isinstance(func, DragKernel), "The analytic solution does not support custom force models"
+        assert func.density is None, "The analytic solution only supports a constant density atmosphere"
+        if buf is None:
+            buf = TrajectoryBuffer(len(y_i), 1 if t_sample is None else len(t_sample) + 1)
+        start = buf.size
+        t0 = buf.time[start - 1] if start else 0.0
+        r0, v0 = y_i[self.__as], y_i[self.__vs]
+        t_end, v_end = analytic.phase_end(r0, v0, func.k, self.phase[phase])
+        if t_sample is None:
+            time = np.array([t_end])
+        else:
+            time = np.append(t_sample[(t_sample > 0.0) & (t_sample < t_end)], t_end)
+        r, v = analytic.state_at(r0, v0, func.k, time)
+        r[-1], v[-1] = min(r0, self.phase[phase]), v_end
+        results = np.zeros((len(time), len(y_i)))
+        results[:, self.__as] = r
+        results[:, self.__vs] = v
+        buf.extend(t0 + time, results)
+        results, time = buf.view(start)
+        return results, time - t0
+
+    def sim(self, y_i, dt, func, phase, buf=None, every=1):
+        """
+        Evaluates the equations of motion using numerical integration. The integration method of each phase is either
+        the fixed step Runge-Kutta 4 integrator or the adaptive Dormand-Prince 5(4) integrator, which ends the phase
+        exactly on its breaking condition. The chunks of steps() are written in place into a trajectory buffer.
+        :param y_i: initial state vector
+        :param dt: time step for that phase, initial time step for the adaptive integrator
         :param func: The equations of motion
         :param phase: The current phase that is being run
+        :param buf: TrajectoryBuffer to write the state vectors into, by default a new one
+        :param every: default 1, record every k-th step, 0 to only record the end of the phase
         :return:
             results: ndarray of all state vectors for the entire descent.
             time: ndarray of the time which each state vector correlates with.
         """
-        y = y_i
-        results = []
+        if buf is None:
+            buf = TrajectoryBuffer(len(y_i), 1 + self.estimate_rows(y_i, every))
+        start = buf.size
+        t0 = buf.time[start - 1] if start else 0.0
+        key = None
+        self.__hit = False
+        record = None if self.instrument is None else self.instrument.start("mission", phase, title=self.title)
+        if self.use_cache and func is self.__equ[phase]:
+            key = self.fingerprint(y_i, phase, dt, every)
+            hit = cache.phases.get(key)
+            if hit is not None:
+                self.__hit = True
+                buf.extend(t0 + hit[1], hit[0])
+                if record is not None:
+                    self.instrument.stop(record, 0, 0, cached=True)
+                results, time = buf.view(start)
+                return results, time - t0
+        for _ in self.steps(y_i, dt, func, phase, every, t0=t0, buf=buf):
+            pass
+        if record is not None:
+            self.instrument.stop(record, *self.__count)
+        results, time = buf.view(start)
+        if key is not None and cache.phases.fits(results.nbytes + time.nbytes):
+            cache.phases.put(key, (results.copy(), time - t0), results.nbytes + time.nbytes)
+        return results, time - t0
+
+    def steps(self, y_i, dt, func, phase, every=1, chunk=1024, t0=0.0, buf=None):
+        """
+        Integrates a phase and yields the recorded state vectors in chunks while integrating, so only one chunk is held
+        in memory at a time. The end of the phase is always in the last chunk. With a trajectory buffer the chunks are
+        the buffer's own rows, so the fixed step integrator writes every state vector once, in place.
+        :param y_i: initial state vector
+        :param dt: time step for that phase, initial time step for the adaptive integrator
+        :param func: The equations of motion
+        :param phase: The current phase that is being run
+        :param every: default 1, yield every k-th step, 0 to only yield the end of the phase
+        :param chunk: default 1024, number of state vectors in each chunk
+        :param t0: default 0, time of the start of the phase, added to the yielded times
+        :param buf: optional TrajectoryBuffer the chunks are written into, the yielded chunks are views of it that are
+        only valid until the next chunk
+        :return: generator of (time, results), the time and the state vectors of a chunk
+        """
+        bc = self.phase[phase]
+        if self.integrator[phase] == "dp45":
+            s = self.__as
+            results, time, n_eval, n_reject = dopri45(func, y_i, dt, lambda y: y[s] - bc, self.rtol, self.atol)
+            self.__count = (len(time), n_eval, n_reject)
+            keep = np.arange(len(time) - 1, -1, -every)[::-1] if every else np.array([len(time) - 1])
+            for j in range(0, len(keep), chunk):
+                rows = keep[j:j + chunk]
+                if buf is not None:
+                    buf.extend(t0 + time[rows], results[rows])
+                yield t0 + time[rows], results[rows]
+            return
+
+        def new_chunk():
+            if buf is None:
+                return np.empty(chunk), np.empty((chunk, len(y_i)))
+            buf.reserve(chunk)
+            return buf.time[buf.size:buf.size + chunk], buf.data[buf.size:buf.size + chunk]
+        time, results = new_chunk()
+        j = 0
         it = 0
-        while self.bcon(y, self.phase[phase]):
-            it += 1
-            y = self.rk4(y, func, dt)
-            results.append(y)
-        results = np.asarray(results)
-        time = np.arange(it) * dt
-        return results, time
+        if isinstance(func, DragKernel):
+            k, c, density = func.k, func.c, func.density
+            r, v = float(y_i[self.__as]), float(y_i[self.__vs])
+            while r > bc:
+                it += 1
+                if density is None:
+                    r, v = drag_rk4(r, v, k, dt)
+                else:
+                    r, v = drag_rk4_density(r, v, c, dt, density)
+                if every and it % every == 0:
+                    time[j] = t0 + (it - 1) * dt
+                    results[j, self.__as] = r
+                    results[j, self.__vs] = v
+                    j += 1
+                    if j == chunk:
+                        if buf is not None:
+                            buf.size += chunk
+                        yield time, results
+                        time, results = new_chunk()
+                        j = 0
+            y = (r, v)
+        else:
+            y = y_i
+            while self.bcon(y, bc):
+                it += 1
+                y = self.rk4(y, func, dt)
+                if every and it % every == 0:
+                    time[j] = t0 + (it - 1) * dt
+                    results[j] = y
+                    j += 1
+                    if j == chunk:
+                        if buf is not None:
+                            buf.size += chunk
+                        yield time, results
+                        time, results = new_chunk()
+                        j = 0
+        if it and (not every or it % every):
+            time[j] = t0 + (it - 1) * dt
+            results[j] = y
+            j += 1
+        self.__count = (it, 4 * it, 0)
+        if j:
+            if buf is not None:
+                buf.size += j
+            yield time[:j], results[:j]
+
+    def stream(self, chunk=1024, record=1, reducers=()):
+        """
+        Runs the mission and yields the trajectory in chunks while integrating. Nothing is stored on the Mission, the
+        reducers summarize the run on the fly, so a run of any length or time step takes constant memory. The first
+        chunk is the initial state, after it the chunks of each phase follow in the same order as results.path[0].
+        :param chunk: default 1024, number of state vectors in each chunk
+        :param record: default 1, yield every k-th step of the integration or "endpoints" to only yield the end of
+        each phase. The end of each phase is always yielded.
+        :param reducers: list of reducers from reducers.py that are updated with every chunk
+        :return: generator of (phase, time, results), the phase, the mission time and the state vectors of a chunk
+        """
+        if record == "endpoints":
+            every = 0
+        else:
+            assert isinstance(record, int) and record > 0, "\"record\" must be a positive int or \"endpoints\""
+            every = record
+        y = np.asarray(self.__state, dtype=float)
+        t0 = 0.0
+        time, results = np.array([t0]), y[np.newaxis]
+        for reducer in reducers:
+            reducer.update(0, time, results)
+        yield 0, time, results
+        for i in range(self.__n):
+            for time, results in self.steps(y, self.dt[i], self.__equ[i], i, every, chunk, t0):
+                for reducer in reducers:
+                    reducer.update(i, time, results)
+                yield i, time, results
+            t0, y = time[-1], results[-1].copy()
+            for reducer in reducers:
+                reducer.end_phase(i, t0, y)
 
     @staticmethod
-    def make_equ(mass, area, c_d):
+    def make_equ(mass, area, c_d, force=None, atmosphere=None):
         """
-        Using symbolics to derive the equations of motion for each falling section with a given mass, area, and
-        coefficient of drag
-        :param mass: list of masses for each phase of descent
-        :param area: list of reference area for each phase
-        :param c_d: list of drag coefficients for each phase
+        Builds the equations of motion for each falling section with a given mass, area, and coefficient of drag. The
+        drag plus gravity model is a precompiled kernel, a custom force model is derived symbolically with sympy.
+        :param mass: mass of the falling section
+        :param area: reference area of the parachute
+        :param c_d: drag coefficient of the parachute
+        :param force: optional function of the sympy symbols (r_y, v_y) returning an extra acceleration term
+        :param atmosphere: atmosphere model, default is the constant sea level density
         :return: function that will input a ndarray state vector and return the time derivative
         """
-        r_y, v_y = sy.symbols("r_y, v_y")
-        g = 32.17405
-        rho = 0.0023769
-        d_r_y = v_y
-
-        d_v_drag = (c_d * 0.5 * rho * area * v_y ** 2) / mass
-        d_v_y = d_v_drag - g
-
-        var = [r_y, v_y]
-        equs = sy.Matrix([d_r_y, d_v_y])
-        l_equ = sy.lambdify([var], equs)
-        return l_equ
+        if force is None:
+            return DragKernel(mass, area, c_d, atmosphere)
+        from simulator import symbolic
+        if atmosphere is None:
+            return symbolic.make_equ(mass, area, c_d, force)
+        assert atmosphere.constant, "Custom force models only support a constant density atmosphere"
+        return symbolic.make_equ(mass, area, c_d, force, atmosphere.rho)
 
     def bcon(self, y, bc):
         """
@@ -147,20 +612,15 @@ class Mission(object):
         s = self.__as
         return y[s] > bc
 
-    def plot_path(self, label=""):
+    def plot_path(self, label="", points=2000):
         """
-        Plots the altitude over time of descent
+        Plots the altitude over time of descent, matplotlib is only imported here
         :param label: Label of the object descending
+        :param points: default 2000, largest number of points plotted, see TrajectoryIndex.lod
         :return: None
         """
-        x = self.results.time[0]
-        y = self.results.path[0][:, 0]
-        plt.scatter(self.time_lim, 0, label="Time limit")
-        plt.scatter(self.results.time[0][-1], 0, c="BLACK", marker="x")
-        plt.plot(x, y, label=label)
-        plt.title("Altitude Plot")
-        plt.xlabel("Time (sec)")
-        plt.ylabel("Altitude (ft)")
+        from simulator import plotting
+        plotting.plot_path(self.results, self.time_lim, label, points)
 
     @staticmethod
     def rk4(yn, f, h):
@@ -202,6 +662,27 @@ class Mission(object):
         """
         return np.sqrt(ke*2.0/m)
 
+    def save(self, path, dtype=np.float64, winds=()):
+        """
+        Writes the results of the last run to an archive, see store.py
+        :param path: archive directory
+        :param dtype: dtype of the stored state vectors, np.float32 halves the size of the archive
+        :param winds: default none, wind speeds (mph) to store the 3D drift of, see store.write()
+        :return: None
+        """
+        from simulator import store
+        store.write(path, [self.results], [self.setup], dtype, winds)
+
+    def drift(self, winds, record=False):
+        """
+        Integrates the descent in three dimensions through each of the wind profiles. The drag is evaluated on the
+        velocity relative to the wind, custom force models are not included.
+        :param winds: list of WindProfile
+        :param record: flag to keep the trajectory of each wind profile
+        :return: Descent3DResults, the drift distance of each wind profile is in its drift attribute
+        """
+        return Descent3D(self.setup, winds).run(record)
+
     def display(self, table, append=False, **kwargs):
         if "dec" in kwargs:
             dec = kwargs["dec"]
@@ -209,8 +690,12 @@ class Mission(object):
             dec = 2
         if table == "drift":
             wind_speeds = [0, 5, 10, 15, 20]
-            descent_time = self.results.time_final[0]
-            drift_distance = [round(1.466667*wind*descent_time, dec) for wind in wind_speeds]
+            if any(force is not None for force in self.setup.forces):
+                descent_time = self.results.time_final[0]
+                drift_distance = [round(1.466667*wind*descent_time, dec) for wind in wind_speeds]
+            else:
+                drift = self.drift([WindProfile.uniform(wind) for wind in wind_speeds]).drift
+                drift_distance = [round(d, dec) for d in drift]
             row_format = "{:>10}" * (len(wind_speeds) + 1)
             if not append:
                 print("Drift Due to Wind (ft)")
@@ -226,7 +711,7 @@ class Mission(object):
                 print(row_format.format("", *phases))
             print(row_format.format(self.title, *vel))
         elif table == "time":
-            time = [t for t in self.results.time_final]
+            time = [round(t, dec) for t in self.results.time_final]
             fz = "Phase "
             phases = [fz+str(i+1) for i in range(self.__n)]
             phases.insert(0, "Total")
@@ -0,0 +1,23 @@
+"""
+Description: Plotting of mission results with matplotlib. This module is only imported when a plot is made, so the
+simulation itself never imports matplotlib and starts quickly in worker processes and on the command line.
+"""
+import matplotlib.pyplot as plt
+
+
+def plot_path(results, time_lim, label="", points=2000):
+    """
+    Plots the altitude over time of descent, decimated with the min/max pyramid of the trajectory index
+    :param results: Results of a mission
+    :param time_lim: time limit of the mission, marked on the time axis
+    :param label: Label of the object descending
+    :param points: default 2000, largest number of points plotted
+    :return: None
+    """
+    x, y = results.index().lod(0, points=points)
+    plt.scatter(time_lim, 0, label="Time limit")
+    plt.scatter(results.time[0][-1], 0, c="BLACK", marker="x")
+    plt.plot(x, y, label=label)
+    plt.title("Altitude Plot")
+    plt.xlabel("Time (sec)")
+    plt.ylabel("Altitude (ft)")
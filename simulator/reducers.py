@@ -0,0 +1,124 @@
+"""
+Description: Reducers that summarize a streamed mission while it is being integrated. Mission.stream() hands every
+chunk of state vectors to each reducer and tells it when a phase ends, so a reducer only keeps what it needs and a run
+of any length takes constant memory.
+
+Details: A reducer has three methods. update(phase, time, state) is called with every chunk, time is the mission time
+of each row and state is the (rows, n_state) array of state vectors. end_phase(phase, time, state) is called with the
+time and state vector at the end of each phase. The reduced value is the attribute result. The chunks are only valid
+during the call, a reducer that keeps rows must copy them.
+"""
+import numpy as np
+
+
+class Reducer(object):
+    def __init__(self, pos=0, vel=1):
+        """
+        :param pos: index of the altitude in the state vector
+        :param vel: index of the velocity in the state vector
+        """
+        self.pos = pos
+        self.vel = vel
+        self.result = None
+
+    def update(self, phase, time, state):
+        pass
+
+    def end_phase(self, phase, time, state):
+        pass
+
+
+class MaxSpeed(Reducer):
+    def __init__(self, pos=0, vel=1):
+        """
+        Largest speed of the mission and of each phase
+        """
+        super(MaxSpeed, self).__init__(pos, vel)
+        self.result = 0.0
+        self.phases = []
+
+    def update(self, phase, time, state):
+        speed = float(np.max(np.abs(state[:, self.vel])))
+        while len(self.phases) <= phase:
+            self.phases.append(0.0)
+        self.phases[phase] = max(self.phases[phase], speed)
+        self.result = max(self.result, speed)
+
+
+class PhaseEndKE(Reducer):
+    def __init__(self, masses, pos=0, vel=1):
+        """
+        Kinetic energy at the end of each phase
+        :param masses: mass of each phase, a float or a ndarray of the section masses, same as the split of run_mission
+        """
+        super(PhaseEndKE, self).__init__(pos, vel)
+        self.masses = masses
+        self.result = []
+
+    def end_phase(self, phase, time, state):
+        self.result.append(0.5 * self.masses[phase] * state[self.vel] ** 2)
+
+
+class TimeToAltitude(Reducer):
+    def __init__(self, altitude, pos=0, vel=1):
+        """
+        First mission time the descent reaches an altitude, interpolated between the recorded state vectors. The
+        result is None if the altitude is never reached.
+        :param altitude: altitude to reach
+        """
+        super(TimeToAltitude, self).__init__(pos, vel)
+        self.altitude = altitude
+        self.last = None
+
+    def update(self, phase, time, state):
+        if self.result is not None:
+            return
+        r = state[:, self.pos]
+        below = np.flatnonzero(r <= self.altitude)
+        if len(below):
+            i = below[0]
+            if i:
+                t_a, r_a = time[i - 1], r[i - 1]
+            elif self.last is not None:
+                t_a, r_a = self.last
+            else:
+                t_a, r_a = time[0], r[0]
+            w = (r_a - self.altitude) / (r_a - r[i]) if r_a != r[i] else 1.0
+            self.result = float(t_a + w * (time[i] - t_a))
+        self.last = (time[-1], r[-1])
+
+
+class TelemetryError(Reducer):
+    def __init__(self, times, altitudes, pos=0, vel=1):
+        """
+        Compares the simulated altitude with telemetry. Each telemetry sample is compared with the simulated altitude
+        linearly interpolated at its time, as soon as the stream passes that time. The result is the largest absolute
+        error, the root mean square error is the attribute rms.
+        :param times: ndarray of increasing mission times of the telemetry
+        :param altitudes: ndarray of the telemetry altitudes
+        """
+        super(TelemetryError, self).__init__(pos, vel)
+        self.times = np.asarray(times, dtype=float)
+        self.altitudes = np.asarray(altitudes, dtype=float)
+        self.next = 0
+        self.count = 0
+        self.square = 0.0
+        self.result = 0.0
+        self.rms = 0.0
+        self.last = None
+
+    def update(self, phase, time, state):
+        r = state[:, self.pos]
+        if self.last is not None:
+            time = np.append(self.last[0], time)
+            r = np.append(self.last[1], r)
+        stop = np.searchsorted(self.times, time[-1], side="right")
+        if stop > self.next:
+            t = self.times[self.next:stop]
+            error = np.abs(np.interp(t, time, r) - self.altitudes[self.next:stop])
+            self.result = max(self.result, float(np.max(error)))
+            self.square += float(np.sum(error ** 2))
+            self.count += len(t)
+            self.rms = np.sqrt(self.square / self.count)
+            self.next = stop
+        self.last = (time[-1], r[-1])
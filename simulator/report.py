@@ -0,0 +1,260 @@
+"""
+Description: Report tables over many missions, ensemble members or archived missions. The drift, velocity, time and
+kinetic energy tables of Mission.display() are computed for every row at once as arrays and can be printed in the same
+layout, or written as CSV and Markdown.
+
+Details: A Report holds the final values of every row as (rows, phases) arrays, each table is a Table of row labels,
+column names and a 2D array of values. The drift of missions comes from the 3D simulation in descent3d.py, the same as
+Mission.display(), with one Descent3D run over every mission and wind speed. Ensembles and archives get the drift of a
+uniform wind carrying the section for the whole descent, wind speed times descent time, by default, which is one outer
+product over every member, and the drift table says so in its title. The 3D drift is opt-in for them with
+integrate=True, or stored with the archive when it is written, since it is a full integration of every member and
+wind speed. Missions with custom force models always get the wind speed times descent time drift, like
+Mission.display().
+"""
+import csv
+import io
+import os
+import numpy as np
+from simulator.descent3d import Descent3D
+from simulator.wind import WindProfile
+from tools import tofps
+
+wind_speeds = [0, 5, 10, 15, 20]
+
+
+def ke_rows(ke, n, title):
+    """
+    Kinetic energy table rows of one mission
+    :param ke: list of the kinetic energy at the end of each phase, floats or ndarrays of the split sections
+    :param n: number of phase columns, missing phases are nan
+    :param title: title of the mission, the label of a mission that is not split
+    :return: (rows, n) ndarray and the list of row labels
+    """
+    rows = np.full((np.size(ke[0]), n), np.nan)
+    rows[:, :len(ke)] = np.column_stack([np.atleast_1d(k) for k in ke])
+    if np.ndim(ke[0]):
+        return rows, ["Mass" + str(i + 1) for i in range(len(rows))]
+    return rows, [title]
+
+
+def drift_rows(setups, time_final, winds=wind_speeds, k=None):
+    """
+    Drift of each row through a uniform wind of each speed, integrated in 3D with one Descent3D run for every group of
+    rows with the same number of phases and atmosphere model
+    :param setups: list of MissionSetup, one for each row
+    :param time_final: list of the total descent time of each row, for the rows with custom force models
+    :param winds: wind speeds (mph)
+    :param k: optional (rows, n) ndarray of the drag constant of each row and phase, by default from the setups
+    :return: (rows, winds) ndarray (ft)
+    """
+    drift = np.outer(time_final, tofps(np.asarray(winds, dtype=float), 'mph'))
+    groups = {}
+    for j, setup in enumerate(setups):
+        if all(force is None for force in setup.forces):
+            key = (setup.n, None if setup.atmosphere.constant else id(setup.atmosphere))
+            groups.setdefault(key, []).append(j)
+    if not len(winds):
+        return drift
+    profiles = [WindProfile.uniform(w) for w in winds]
+    for rows in groups.values():
+        descent = Descent3D([setups[j] for j in rows for _ in winds], profiles * len(rows))
+        if k is not None:
+            descent.k = np.repeat(np.asarray(k, dtype=float)[rows], len(winds), axis=0)
+        drift[rows] = descent.run().drift.reshape(len(rows), len(winds))
+    return drift
+
+
+class Table(object):
+    def __init__(self, title, columns, labels, values):
+        """
+        :param title: title of the table
+        :param columns: list of the column names
+        :param labels: list of the row labels
+        :param values: (rows, columns) ndarray
+        """
+        self.title = title
+        self.columns = list(columns)
+        self.labels = list(labels)
+        self.values = values
+
+    def rows(self, dec=None):
+        """
+        :param dec: number of decimals to round to, None to not round
+        :return: list of rows, each the row label followed by the values as floats
+        """
+        values = (self.values if dec is None else np.round(self.values, dec)).tolist()
+        return [[label] + row for label, row in zip(self.labels, values)]
+
+    def text(self, dec=2, header=True):
+        """
+        Fixed width text in the layout of Mission.display()
+        :param dec: default 2, number of decimals
+        :param header: default True, flag to start with the title and the column names
+        :return: str
+        """
+        row_format = "{:>10}" * (len(self.columns) + 1)
+        lines = [self.title, row_format.format("", *self.columns)] if header else []
+        lines += [row_format.format(*row) for row in self.rows(dec)]
+        return "\n".join(lines)
+
+    def markdown(self, dec=2):
+        """
+        :param dec: default 2, number of decimals
+        :return: str of a Markdown table
+        """
+        lines = ["**{0}**".format(self.title), "",
+                 "| " + " | ".join([""] + [str(c) for c in self.columns]) + " |",
+                 "|---" + "|---:" * len(self.columns) + "|"]
+        lines += ["| " + " | ".join(str(x) for x in row) + " |" for row in self.rows(dec)]
+        return "\n".join(lines)
+
+    def csv(self, path=None, dec=None):
+        """
+        :param path: optional path of the csv file
+        :param dec: number of decimals to round to, None to not round
+        :return: str of the csv when no path is given, None otherwise
+        """
+        f = io.StringIO() if path is None else open(path, "w", newline="")
+        with f:
+            writer = csv.writer(f)
+            writer.writerow([""] + self.columns)
+            writer.writerows(self.rows(dec))
+            if path is None:
+                return f.getvalue()
+
+
+class Report(object):
+    def __init__(self, titles, time_final, vel_final, ke, ke_labels, drift, winds=wind_speeds, estimate=False):
+        """
+        Tables of the final values of many missions
+        :param titles: list of the title of each row
+        :param time_final: (rows, n + 1) ndarray, total descent time followed by the time of each phase
+        :param vel_final: (rows, n) ndarray of the velocity at the end of each phase
+        :param ke: (ke rows, n) ndarray of the kinetic energy at the end of each phase
+        :param ke_labels: list of the label of each kinetic energy row
+        :param drift: (rows, winds) ndarray of the drift for each wind speed
+        :param winds: wind speeds of the drift table (mph)
+        :param estimate: default False, flag for a drift of wind speed times descent time, shown in the table title
+        """
+        self.titles = list(titles)
+        self.time_final = time_final
+        self.vel_final = vel_final
+        self.ke = ke
+        self.ke_labels = list(ke_labels)
+        self.drift = drift
+        self.winds = list(winds)
+        phases = ["Phase " + str(i + 1) for i in range(vel_final.shape[1])]
+        drift_title = "Drift Due to Wind, wind x time estimate (ft)" if estimate else "Drift Due to Wind (ft)"
+        self.tables = {"drift": Table(drift_title, self.winds, self.titles, drift),
+                       "velocity": Table("Max Descent Velocity (ft/s)", phases, self.titles, np.abs(vel_final)),
+                       "time": Table("Time for Descent (s)", ["Total"] + phases, self.titles, time_final),
+                       "ke": Table("Kinetic Energy (ft lbs)", phases, self.ke_labels, ke)}
+
+    @classmethod
+    def from_missions(cls, missions, winds=wind_speeds, sections=None, integrate=True):
+        """
+        Report of missions that have been run
+        :param missions: list of Mission
+        :param winds: wind speeds of the drift table (mph)
+        :param sections: optional list with the names of the split sections of each mission for the ke table
+        :param integrate: default True, flag to integrate the drift through each wind in 3D like Mission.display(),
+        False for wind speed times descent time
+        :return: Report
+        """
+        n = max(len(m.results.vel_final) for m in missions)
+        time_final = np.full((len(missions), n + 1), np.nan)
+        vel_final = np.full((len(missions), n), np.nan)
+        rows = []
+        ke_labels = []
+        for j, mission in enumerate(missions):
+            res = mission.results
+            time_final[j, :len(res.time_final)] = res.time_final
+            vel_final[j, :len(res.vel_final)] = res.vel_final
+            ke, labels = ke_rows(res.ke, n, mission.title)
+            rows.append(ke)
+            if sections is not None and sections[j] is not None:
+                labels = sections[j]
+            ke_labels += labels
+        if integrate:
+            drift = drift_rows([m.setup for m in missions], time_final[:, 0], winds)
+        else:
+            drift = np.outer(time_final[:, 0], tofps(np.asarray(winds, dtype=float), 'mph'))
+        return cls([m.title for m in missions], time_final, vel_final, np.vstack(rows), ke_labels, drift, winds,
+                   not integrate)
+
+    @classmethod
+    def from_ensemble(cls, ensemble, winds=wind_speeds, integrate=False):
+        """
+        Report of every member of an ensemble that has been run
+        :param ensemble: Ensemble or Sections
+        :param winds: wind speeds of the drift table (mph)
+        :param integrate: default False, flag to integrate the drift of every member and wind speed in 3D with the
+        drag constants of the ensemble, so the rows of Sections get the drift of their own section. False for wind
+        speed times descent time, which takes milliseconds instead of a full integration.
+        :return: Report
+        """
+        results = ensemble.results
+        if integrate:
+            drift = drift_rows(ensemble.setups, results.time_final[:, 0], winds, ensemble.k)
+        else:
+            drift = np.outer(results.time_final[:, 0], tofps(np.asarray(winds, dtype=float), 'mph'))
+        return cls(ensemble.titles, results.time_final, results.vel_final, results.ke, ensemble.titles, drift, winds,
+                   not integrate)
+
+    @classmethod
+    def from_archive(cls, archive, winds=wind_speeds):
+        """
+        Report of the missions of an archive from the final values alone, without reading any trajectory. The drift
+        stored with the archive is used when it has the same wind speeds, otherwise the table is the wind speed times
+        descent time estimate, see store.write().
+        :param archive: Archive from store.py
+        :param winds: wind speeds of the drift table (mph)
+        :return: Report
+        """
+        titles = [mission["title"] for mission in archive.meta["missions"]]
+        n = max(len(v) for v in archive.finals("vel_final"))
+        time_final = np.full((len(titles), n + 1), np.nan)
+        vel_final = np.full((len(titles), n), np.nan)
+        rows = []
+        ke_labels = []
+        for j, mission in enumerate(archive.meta["missions"]):
+            time_final[j, :len(mission["time_final"])] = mission["time_final"]
+            vel_final[j, :len(mission["vel_final"])] = mission["vel_final"]
+            ke, labels = ke_rows([np.asarray(k) for k in mission["ke"]], n, mission["title"])
+            rows.append(ke)
+            ke_labels += labels
+        stored = all(mission.get("winds") == list(winds) for mission in archive.meta["missions"])
+        if stored:
+            drift = np.array([mission["drift"] for mission in archive.meta["missions"]], dtype=float)
+        else:
+            drift = np.outer(time_final[:, 0], tofps(np.asarray(winds, dtype=float), 'mph'))
+        return cls(titles, time_final, vel_final, np.vstack(rows), ke_labels, drift, winds, not stored)
+
+    def text(self, tables=("drift", "velocity", "time", "ke"), dec=2):
+        """
+        :param tables: names of the tables in order
+        :param dec: default 2, number of decimals
+        :return: str of every table in the layout of Mission.display(), separated by blank lines
+        """
+        return "\n\n".join(self.tables[name].text(dec) for name in tables)
+
+    def markdown(self, tables=("drift", "velocity", "time", "ke"), dec=2):
+        """
+        :param tables: names of the tables in order
+        :param dec: default 2, number of decimals
+        :return: str of every table as Markdown, separated by blank lines
+        """
+        return "\n\n".join(self.tables[name].markdown(dec) for name in tables)
+
+    def write_csv(self, path, tables=("drift", "velocity", "time", "ke"), dec=None):
+        """
+        Writes each table to <name>.csv in a directory
+        :param path: directory, created if it does not exist
+        :param tables: names of the tables
+        :param dec: number of decimals to round to, None to not round
+        :return: None
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in tables:
+            self.tables[name].csv(os.path.join(path, name + ".csv"), dec)
@@ -0,0 +1,106 @@
+"""
+Description: The Sections class integrates the sections of a vehicle as separate falling bodies. Each section has its
+own mass, and in every phase the sections are either tethered together under the drag of all their parachutes or
+separated, each under its own parachute. The landing velocity and kinetic energy of every section come from its own
+trajectory instead of from the velocity of the combined vehicle.
+
+Details: Every section of every vehicle is one row of the stacked state array of the Ensemble engine, so all sections of
+all vehicles are integrated in one vectorized pass. A tethered row uses the drag constant of the whole vehicle,
+0.5*rho*sum(Cd*S)/sum(m), so the rows of tethered sections follow the same trajectory. A separated row uses the drag
+constant of its own parachute and mass, a section without a parachute falls without drag. Sections cannot be tethered
+again after they separate.
+"""
+import numpy as np
+from setup_files.mission_chutes import parachutes
+from simulator.ensemble import Ensemble
+from simulator.kernels import drag_constant
+
+
+class Sections(Ensemble):
+    def __init__(self, setups, sections, chutes=None, tethered=None, instrument=None):
+        """
+        :param setups: list of MissionSetup, one for each vehicle
+        :param sections: list for each vehicle of a dict of {section name: mass}
+        :param chutes: list for each vehicle of a list for each phase of the parachute of each section, a name in
+        mission_chutes.py, a Parachute or None. By default the parachute of the setup is on the first section.
+        :param tethered: list for each vehicle of a list for each phase of flags, True when the sections fall
+        together. By default the sections stay tethered.
+        :param instrument: optional Instrument from instrument.py, see Ensemble
+        """
+        assert len(setups) == len(sections), "There must be one dict of sections for each setup"
+        n = setups[0].n
+        for setup in setups:
+            assert setup.n == n, "Every setup must have the same number of phases"
+            assert all(force is None for force in setup.forces) and all(m == "rk4" for m in setup.integrator), \
+                "The batch engine only integrates the drag plus gravity model with the rk4 integrator"
+        if chutes is None:
+            chutes = [None] * len(setups)
+        if tethered is None:
+            tethered = [None] * len(setups)
+        self.n = n
+        self.vehicles = setups
+        self.rows = []
+        state, mass, dt, bc, k = [], [], [], [], []
+        if all(setup.atmosphere.constant for setup in setups):
+            self.density = None
+        else:
+            for setup in setups:
+                assert setup.atmosphere is setups[0].atmosphere, "Every setup must share the same atmosphere model"
+            self.density = setups[0].atmosphere.density
+        for v, setup in enumerate(setups):
+            names = list(sections[v])
+            masses = np.array([sections[v][name] for name in names], dtype=float)
+            phase_chutes = chutes[v]
+            if phase_chutes is None:
+                phase_chutes = [[setup.chutes[i]] + [None] * (len(names) - 1) for i in range(n)]
+            flags = tethered[v] if tethered[v] is not None else [True] * n
+            assert len(phase_chutes) == n and len(flags) == n, "\"chutes\" and \"tethered\" need an entry per phase"
+            for i in range(1, n):
+                assert flags[i - 1] or not flags[i], "Sections cannot be tethered again after they separate"
+            rho = setup.atmosphere.rho if self.density is None else 1.0
+            k_v = np.zeros((len(names), n))
+            for i in range(n):
+                assert len(phase_chutes[i]) == len(names), "Every phase needs a parachute entry for each section"
+                cds = np.array([self.drag_area(chute) for chute in phase_chutes[i]])
+                if flags[i]:
+                    k_v[:, i] = drag_constant(masses.sum(), cds.sum(), 1.0, rho)
+                else:
+                    k_v[:, i] = drag_constant(masses, cds, 1.0, rho)
+            for s, name in enumerate(names):
+                self.rows.append((v, name))
+                state.append(setup.initial_state)
+                mass.append([masses[s]] * n)
+                dt.append(setup.dt)
+                bc.append(setup.bc)
+            k.append(k_v)
+        self.setups = [setups[v] for v, name in self.rows]
+        self.titles = ["{0} {1}".format(setups[v].title, name) for v, name in self.rows]
+        self.state = np.array(state, dtype=float)
+        self.mass = np.array(mass, dtype=float)
+        self.dt = np.array(dt, dtype=float)
+        self.bc = np.array(bc, dtype=float)
+        self.k = np.concatenate(k)
+        self.results = None
+        self.instrument = instrument
+
+    @staticmethod
+    def drag_area(chute):
+        """
+        :param chute: name in mission_chutes.py, Parachute or None
+        :return: Cd*S of the parachute, 0 for None
+        """
+        if chute is None:
+            return 0.0
+        if isinstance(chute, str):
+            chute = parachutes[chute]
+        return chute.cd * chute.S
+
+    def landing(self):
+        """
+        Landing velocity and kinetic energy of every section of the last run
+        :return: list for each vehicle of a dict of {section name: (landing velocity, kinetic energy)}
+        """
+        out = [{} for _ in self.vehicles]
+        for row, (v, name) in enumerate(self.rows):
+            out[v][name] = (float(self.results.vel_final[row, -1]), float(self.results.ke[row, -1]))
+        return out
@@ -0,0 +1,325 @@
+"""
+Description: Local descent query service. A long running process answers descent queries over HTTP on localhost or on
+a Unix socket, so dashboards and scripts do not start Python, import the simulator and build missions for every
+question.
+
+Details: A query is a JSON object with the case keys of sweep.py (drogue, main or chutes, deploy or bc, mass or split,
+state, dt, name) and optionally winds, the wind speeds of the drift (mph), dec, the number of decimals (default 2), and
+drift, the drift model. The answer has the values of the Mission display tables: the descent time in total and of each
+phase, the descent speed at the end of each phase, the kinetic energy of each section at the end of each phase and the
+drift of each wind speed. Concurrent queries are collected by an asyncio queue and every batch is integrated together,
+the 1D descent with the Ensemble engine, or the Mission class for small batches, and the drift with one Descent3D run over every query and wind speed. While one
+batch is integrated in a worker thread the next one collects, so the batches grow with the load. Answers are kept in an
+LRU cache, so repeated queries skip the integration.
+The 3D drift is most of the cost of a new query, about 0.8 s of 1.1 s at the default time step. The drift model of a
+query is "3d", the 3D simulation like Mission.display(), or "estimate", wind speed times descent time, which takes
+milliseconds. The default model and the time step of the 3D drift are options of the service, a coarser step is
+faster but too coarse a step for the main parachute does not converge and the query is answered with an error. The 3D
+drift of every setup and wind speed is kept in its own LRU cache, so queries that only change the split, the decimals
+or the name of a known setup skip the 3D run.
+
+Usage:
+    python -m simulator.service --port 8750
+    curl -s localhost:8750/query -d '{"drogue": "24", "main": "certXXL", "deploy": 600, "split": [0.55, 0.58]}'
+    python -m simulator.service --socket /tmp/descent.sock
+    curl -s --unix-socket /tmp/descent.sock localhost/query -d '{"drogue": "24", "main": "certXXL"}'
+    python -m simulator.service --drift estimate
+    python -m simulator.service --drift-dt 0.05
+POST /query takes one query or a list of queries, GET /health returns the counters of the service. A query that does
+not describe a descent, for example with a time step that is not positive, is answered with status 400 before it is
+queued, so it cannot stall the batches.
+"""
+import argparse
+import asyncio
+import json
+import numpy as np
+from simulator.cache import LRUCache
+from simulator.descent3d import Descent3D
+from simulator.ensemble import Ensemble
+from simulator.mission import Mission
+from simulator.sweep import case_setup
+from simulator.wind import WindProfile
+from tools import tofps
+
+wind_speeds = [0, 5, 10, 15, 20]
+drift_models = ["3d", "estimate"]
+# batches with fewer queries are integrated with the scalar kernel of the Mission class, which is faster than the
+# vectorized Ensemble engine for a few members
+mission_batch = 32
+
+
+def check(case, setup):
+    """
+    Checks that a query describes a descent the integrators can finish
+    :param case: query dict
+    :param setup: MissionSetup of the query
+    :return: None
+    """
+    dt = np.asarray(setup.dt, dtype=float)
+    assert np.all(np.isfinite(dt) & (dt > 0.0)), "\"dt\" must be positive"
+    mass = np.asarray(setup.masses, dtype=float)
+    assert np.all(np.isfinite(mass) & (mass > 0.0)), "\"mass\" must be positive"
+    if "split" in case:
+        split = np.asarray(case["split"], dtype=float)
+        assert np.all(np.isfinite(split) & (split > 0.0)), "\"split\" masses must be positive"
+    area = np.array([chute.cd * chute.S for chute in setup.chutes], dtype=float)
+    assert np.all(np.isfinite(area) & (area >= 0.0)), "Parachute drag areas must be finite and not negative"
+    assert np.all(np.isfinite(setup.initial_state)), "\"state\" must be finite"
+    assert setup.initial_state[1] <= 0.0, "The initial velocity of \"state\" must not be upwards"
+    assert np.all(np.isfinite(np.asarray(setup.bc, dtype=float))), "\"bc\" must be finite"
+    winds = case.get("winds", wind_speeds)
+    assert isinstance(winds, list) and all(isinstance(w, (int, float)) and not isinstance(w, bool) for w in winds), \
+        "\"winds\" must be a list of wind speeds"
+    assert np.all(np.isfinite(np.asarray(winds, dtype=float))), "\"winds\" must be finite"
+    dec = case.get("dec", 2)
+    assert isinstance(dec, int) and not isinstance(dec, bool), "\"dec\" must be an int"
+    assert case.get("drift", "3d") in drift_models, "\"drift\" options: " + ", ".join(drift_models)
+
+
+def drift_key(setup, wind, dt):
+    """
+    :param setup: MissionSetup
+    :param wind: wind speed (mph)
+    :param dt: time step of the 3D drift, None for the time steps of the setup
+    :return: hashable key of everything that determines the 3D drift
+    """
+    return (tuple((float(c.cd), float(c.S)) for c in setup.chutes), tuple(float(m) for m in setup.masses),
+            tuple(float(b) for b in setup.bc), tuple(float(d) for d in setup.dt),
+            tuple(float(x) for x in setup.initial_state), setup.atmosphere.key, float(wind), dt)
+
+
+def evaluate(cases, setups, drift="3d", drift_dt=None, cache=None):
+    """
+    Integrates a batch of queries together
+    :param cases: list of query dicts
+    :param setups: list of MissionSetup, one for each query, with the same number of phases
+    :param drift: default "3d", drift model of the queries that do not give one, see drift_models
+    :param drift_dt: time step of the 3D drift, None for the time steps of the setups
+    :param cache: optional LRUCache of the 3D drift of each setup and wind speed, see drift_key()
+    :return: list of answer dicts
+    """
+    if len(setups) < mission_batch:
+        missions = [Mission(setup) for setup in setups]
+        for mission in missions:
+            mission.run_mission(record="endpoints")
+        time_final = np.array([mission.results.time_final for mission in missions], dtype=float)
+        vel_final = np.array([mission.results.vel_final for mission in missions], dtype=float)
+    else:
+        results = Ensemble(setups).run(record=False)
+        time_final, vel_final = results.time_final, results.vel_final
+    winds = [case.get("winds", wind_speeds) for case in cases]
+    models = [case.get("drift", drift) for case in cases]
+    drifts = [tofps(np.asarray(w, dtype=float), 'mph') * time_final[j, 0] for j, w in enumerate(winds)]
+    todo = {}
+    for j, case_winds in enumerate(winds):
+        if models[j] != "3d":
+            continue
+        for s, w in enumerate(case_winds):
+            key = drift_key(setups[j], w, drift_dt)
+            value = None if cache is None else cache.get(key)
+            if value is None:
+                todo.setdefault(key, (j, w, []))[2].append((j, s))
+            else:
+                drifts[j][s] = value
+    if todo:
+        rows = list(todo.values())
+        descent = Descent3D([setups[j] for j, w, _ in rows], [WindProfile.uniform(w) for j, w, _ in rows])
+        if drift_dt is not None:
+            descent.dt[:] = drift_dt
+        values = descent.run().drift
+        if not np.all(np.isfinite(values)):
+            raise ValueError("The 3D drift did not converge, use a smaller drift time step")
+        for key, (j, w, targets), value in zip(todo, rows, values):
+            for t, s in targets:
+                drifts[t][s] = value
+            if cache is not None:
+                cache.put(key, float(value))
+    answers = []
+    for j, case in enumerate(cases):
+        dec = case.get("dec", 2)
+        vel = vel_final[j]
+        masses = np.asarray(case["split"], dtype=float) if "split" in case else np.array([setups[j].masses[-1]])
+        ke = 0.5 * np.outer(masses, vel ** 2) if "split" in case else [0.5 * np.array(setups[j].masses) * vel ** 2]
+        answers.append({"name": setups[j].title,
+                        "time": np.round(time_final[j], dec).tolist(),
+                        "velocity": np.round(np.abs(vel), dec).tolist(),
+                        "ke": np.round(ke, dec).tolist(),
+                        "winds": list(winds[j]),
+                        "drift": np.round(drifts[j], dec).tolist(),
+                        "drift_model": models[j]})
+    return answers
+
+
+class Service(object):
+    def __init__(self, max_batch=512, cache_size=4096, drift="3d", drift_dt=None):
+        """
+        :param max_batch: default 512, largest number of queries integrated together
+        :param cache_size: default 4096, number of answers kept in the LRU cache, and of 3D drifts in their own cache
+        :param drift: default "3d", drift model of the queries that do not give one, see drift_models
+        :param drift_dt: time step of the 3D drift, None for the time steps of the queries
+        """
+        assert drift in drift_models, "\"drift\" options: " + ", ".join(drift_models)
+        assert drift_dt is None or drift_dt > 0.0, "\"drift_dt\" must be positive"
+        self.max_batch = max_batch
+        self.drift = drift
+        self.drift_dt = drift_dt
+        self.cache = LRUCache(cache_size)
+        self.drift_cache = LRUCache(cache_size)
+        self.queue = None
+        self.batches = 0
+        self.queries = 0
+
+    async def query(self, case):
+        """
+        Answers one query, from the cache or from the next batch
+        :param case: query dict
+        :return: answer dict
+        """
+        self.queries += 1
+        key = json.dumps(dict(case, drift=case.get("drift", self.drift)), sort_keys=True)
+        answer = self.cache.get(key)
+        if answer is not None:
+            return answer
+        setup = case_setup(case)
+        check(case, setup)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((case, setup, future))
+        answer = await future
+        self.cache.put(key, answer)
+        return answer
+
+    async def batcher(self):
+        """
+        Collects the queued queries into batches and integrates them in a worker thread, one batch at a time
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while not self.queue.empty() and len(batch) < self.max_batch:
+                batch.append(self.queue.get_nowait())
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1].n, []).append(item)
+            for items in groups.values():
+                try:
+                    answers = await loop.run_in_executor(None, evaluate, [i[0] for i in items], [i[1] for i in items],
+                                                         self.drift, self.drift_dt, self.drift_cache)
+                except Exception:
+                    # a query that passed check() but still fails only fails itself, the others are run again alone
+                    answers = []
+                    for item in items:
+                        try:
+                            answers += await loop.run_in_executor(None, evaluate, [item[0]], [item[1]], self.drift,
+                                                                  self.drift_dt, self.drift_cache)
+                        except Exception as error:
+                            answers.append(error)
+                for (case, setup, future), answer in zip(items, answers):
+                    if future.done():
+                        continue
+                    if isinstance(answer, Exception):
+                        future.set_exception(answer)
+                    else:
+                        future.set_result(answer)
+            self.batches += 1
+
+    async def respond(self, method, path, body):
+        """
+        :param method: HTTP method
+        :param path: request path
+        :param body: request body
+        :return: HTTP status and JSON answer
+        """
+        if method == "GET" and path == "/health":
+            return 200, {"queries": self.queries, "batches": self.batches, "cache": self.cache.stats(),
+                         "drift_cache": self.drift_cache.stats()}
+        if method != "POST" or path != "/query":
+            return 404, {"error": "Options: POST /query, GET /health"}
+        try:
+            request = json.loads(body or b"null")
+            cases = request if isinstance(request, list) else [request]
+            for case in cases:
+                assert isinstance(case, dict), "A query must be a JSON object"
+            answers = await asyncio.gather(*[self.query(case) for case in cases])
+        except (ValueError, KeyError, TypeError, AssertionError) as error:
+            return 400, {"error": "{0}: {1}".format(type(error).__name__, error)}
+        return 200, answers if isinstance(request, list) else answers[0]
+
+    async def handle(self, reader, writer):
+        """
+        Serves the HTTP/1.1 requests of one connection, the connection is kept open between requests
+        :param reader: asyncio StreamReader
+        :param writer: asyncio StreamWriter
+        :return: None
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, path = line.decode("latin-1").split()[:2]
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if not header.strip():
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, answer = await self.respond(method, path, body)
+                data = json.dumps(answer).encode()
+                keep = headers.get("connection", "").lower() != "close"
+                writer.write("HTTP/1.1 {0} {1}\r\nContent-Type: application/json\r\nContent-Length: {2}\r\n"
+                             "Connection: {3}\r\n\r\n".format(status, "OK" if status == 200 else "Error", len(data),
+                                                              "keep-alive" if keep else "close").encode() + data)
+                await writer.drain()
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8750, socket=None):
+        """
+        Runs the service until it is cancelled
+        :param host: default 127.0.0.1, address to listen on
+        :param port: default 8750, TCP port
+        :param socket: path of a Unix socket to listen on instead of TCP
+        :return: None
+        """
+        self.queue = asyncio.Queue()
+        batcher = asyncio.ensure_future(self.batcher())
+        if socket is None:
+            server = await asyncio.start_server(self.handle, host, port)
+        else:
+            server = await asyncio.start_unix_server(self.handle, socket)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local descent query service")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8750, help="TCP port")
+    parser.add_argument("--socket", default=None, help="Unix socket path, used instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=512, help="largest number of queries integrated together")
+    parser.add_argument("--drift", choices=drift_models, default="3d",
+                        help="drift model of the queries that do not give one")
+    parser.add_argument("--drift-dt", type=float, default=None,
+                        help="time step of the 3D drift (s), default the time steps of the query")
+    args = parser.parse_args(argv)
+
+    service = Service(args.max_batch, drift=args.drift, drift_dt=args.drift_dt)
+    print("Serving descent queries on {0}".format(args.socket or "http://{0}:{1}".format(args.host, args.port)))
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,30 @@
 from setup_files.mission_chutes import parachutes
+from simulator.atmosphere import Constant
 import numpy as np
 
 
 class MissionSetup(object):
-    def __init__(self, name, n_phases, chutes, masses, break_alt, time_step, state, ke_limit=75, time_limit=90):
+    def __init__(self, name, n_phases, chutes, masses, break_alt, time_step, state, ke_limit=75, time_limit=90,
+                 forces=None, integrator=None, rtol=1e-6, atol=1e-6, atmosphere=None):
         assert isinstance(name, str), "\"name\" must be a string"
         assert isinstance(chutes, list), "\"chutes\" must be a list of parachute names"
         assert isinstance(masses, list), "\"masses\" must be a list of masses per phase"
         assert len(chutes) == n_phases, "\"chutes\" must have the same number of parachutes as the number of phases"
         assert len(masses) == n_phases, "\"masses\" must have the same number of masses as the number of phases"
+        assert len(break_alt) == n_phases, "\"break_alt\" must have one breaking altitude for each phase"
         assert len(time_step) == n_phases, "\"time_step\" must have the same number of masses as the number of phases"
         assert isinstance(state, np.ndarray), "\"state\" must be instantiate as an ndarray"
         assert len(state.flatten()) == 2, "\"state\" must be a (2, ) ndarray"
         assert isinstance(ke_limit, (float, int)), "\"ke_limit\" must be a float or int"
         assert isinstance(time_limit, (float, int)), "\"time_limit\" must be a float or int"
+        if forces is None:
+            forces = [None] * n_phases
+        assert len(forces) == n_phases, "\"forces\" must have the same number of force models as the number of phases"
+        if integrator is None:
+            integrator = ["rk4"] * n_phases
+        assert len(integrator) == n_phases, "\"integrator\" must have one integrator per phase"
+        for method in integrator:
+            assert method in ["rk4", "dp45"], "\"integrator\" options: rk4, dp45"
         self.title = name
         self.max_ke = ke_limit
         self.max_time = time_limit
@@ -28,3 +39,8 @@ class MissionSetup(object):
         self.masses = masses
         self.bc = break_alt
         self.dt = time_step
+        self.forces = forces
+        self.integrator = integrator
+        self.rtol = rtol
+        self.atol = atol
+        self.atmosphere = Constant() if atmosphere is None else atmosphere
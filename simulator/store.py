@@ -0,0 +1,186 @@
+"""
+Description: Compact columnar storage of mission results. An archive is a directory holding every trajectory of every
+mission in one state array, one time array, an index of the rows of each mission and phase, and a JSON file with the
+setup and final values of each mission.
+
+Details: The layout of an archive directory is
+    meta.json      version, dtype and for each mission its setup, final values (time, position, velocity, ke) and,
+                   when asked for, the drift through each of a list of wind speeds, integrated in 3D like
+                   Mission.display()
+    path.npy       (rows, n_state) state vectors, float64 or float32
+    time.npy       (rows, ) times, always float64 so long runs keep their time resolution
+    offsets.npy    (missions, max phases + 2) rows where each mission starts, where each phase starts and where the
+                   mission ends, padded with -1
+The arrays are loaded memory mapped, so reading one trajectory from a large archive only reads the pages it touches.
+The final values live in meta.json, so the display tables never touch the trajectories.
+"""
+import json
+import os
+import numpy as np
+from simulator.mission import Results
+from simulator.report import drift_rows
+
+VERSION = 1
+
+
+def setup_meta(setup):
+    """
+    JSON friendly description of a MissionSetup
+    :param setup: MissionSetup
+    :return: dict
+    """
+    return {"title": setup.title,
+            "n": setup.n,
+            "masses": [float(m) for m in setup.masses],
+            "bc": [float(b) for b in setup.bc],
+            "dt": [float(d) for d in setup.dt],
+            "chutes": [{"cd": float(c.cd), "S": float(c.S)} for c in setup.chutes],
+            "initial_state": [float(x) for x in setup.initial_state],
+            "max_ke": setup.max_ke,
+            "max_time": setup.max_time,
+            "integrator": list(setup.integrator),
+            "rtol": setup.rtol,
+            "atol": setup.atol,
+            "atmosphere": list(setup.atmosphere.key)}
+
+
+def write(path, results, setups, dtype=np.float64, winds=()):
+    """
+    Writes the results of several missions to an archive
+    :param path: archive directory, created if it does not exist
+    :param results: list of Results
+    :param setups: list of MissionSetup, one for each Results
+    :param dtype: dtype of the stored state vectors, np.float32 halves the size of the archive
+    :param winds: default none, wind speeds (mph) to store the drift of, see report.drift_rows(). The drift is a full 3D
+    integration of every mission and wind speed, so it is only stored when asked for.
+    :return: None
+    """
+    assert len(results) == len(setups), "There must be one setup for each Results"
+    os.makedirs(path, exist_ok=True)
+    n_rows = sum(len(r.path[0]) for r in results)
+    n_state = results[0].path[0].shape[1]
+    max_phases = max(len(r.path) - 1 for r in results)
+    states = np.lib.format.open_memmap(os.path.join(path, "path.npy"), mode="w+", dtype=dtype,
+                                       shape=(n_rows, n_state))
+    times = np.lib.format.open_memmap(os.path.join(path, "time.npy"), mode="w+", dtype=np.float64, shape=(n_rows,))
+    offsets = np.full((len(results), max_phases + 2), -1, dtype=np.int64)
+    missions = []
+    drift = drift_rows(setups, [res.time_final[0] for res in results], winds) if len(winds) else None
+    row = 0
+    for m, (res, setup) in enumerate(zip(results, setups)):
+        n = len(res.path[0])
+        states[row:row + n] = res.path[0]
+        times[row:row + n] = res.time[0]
+        offsets[m, 0] = row
+        # the whole mission starts with the initial state, the phases follow it
+        phase_start = row + n - sum(len(p) for p in res.path[1:])
+        for i, p in enumerate(res.path[1:]):
+            offsets[m, i + 1] = phase_start
+            phase_start += len(p)
+        offsets[m, len(res.path)] = row + n
+        row += n
+        entry = setup_meta(setup)
+        entry.update({"time_final": [float(t) for t in res.time_final],
+                      "pos_final": [float(p) for p in res.pos_final],
+                      "vel_final": [float(v) for v in res.vel_final],
+                      "ke": [np.asarray(ke, dtype=float).tolist() for ke in res.ke]})
+        if drift is not None:
+            entry.update({"winds": list(winds), "drift": drift[m].tolist()})
+        missions.append(entry)
+    states.flush()
+    times.flush()
+    del states, times
+    np.save(os.path.join(path, "offsets.npy"), offsets)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"version": VERSION, "dtype": np.dtype(dtype).name, "missions": missions}, f)
+
+
+class PhaseTimes(object):
+    def __init__(self, times, bounds):
+        """
+        Times of an archived mission in the layout of Results.time, the whole mission first and then each phase
+        relative to its start. The times of a phase are only read from the archive when that phase is indexed.
+        :param times: memory mapped time array of the archive
+        :param bounds: list of the (start, end) rows of the whole mission followed by those of each phase
+        """
+        self.times = times
+        self.bounds = bounds
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def __getitem__(self, index):
+        """
+        :param index: 0 for the whole mission, i + 1 for phase i, or a slice
+        :return: ndarray of times, a list of them for a slice
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        a, b = self.bounds[index]
+        if index % len(self) == 0:
+            return self.times[a:b]
+        return self.times[a:b] - self.times[a - 1]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class ArchivedResults(Results):
+    def __init__(self, archive, index):
+        """
+        Results of one mission of an archive. The final values are read from the metadata and the trajectories are
+        memory mapped slices of the archive that are only read when they are used.
+        :param archive: Archive
+        :param index: index of the mission in the archive
+        """
+        super(ArchivedResults, self).__init__()
+        meta = archive.meta["missions"][index]
+        self.meta = meta
+        self.title = meta["title"]
+        self.time_final = meta["time_final"]
+        self.pos_final = meta["pos_final"]
+        self.vel_final = meta["vel_final"]
+        self.ke = [np.asarray(ke) if isinstance(ke, list) else ke for ke in meta["ke"]]
+        offsets = archive.offsets[index]
+        n = meta["n"]
+        bounds = [(offsets[0], offsets[n + 1])] + [(offsets[i + 1], offsets[i + 2]) for i in range(n)]
+        self.path = [archive.states[a:b] for a, b in bounds]
+        self.pos = [p[:, 0] for p in self.path]
+        self.vel = [p[:, 1] for p in self.path]
+        self.time = PhaseTimes(archive.times, bounds)
+
+
+class Archive(object):
+    def __init__(self, path):
+        """
+        Opens an archive written by write() with the trajectories memory mapped
+        :param path: archive directory
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        assert self.meta["version"] == VERSION, "Unsupported archive version {0}".format(self.meta["version"])
+        self.states = np.load(os.path.join(path, "path.npy"), mmap_mode="r")
+        self.times = np.load(os.path.join(path, "time.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+
+    def __len__(self):
+        return len(self.meta["missions"])
+
+    def __getitem__(self, index):
+        """
+        :param index: index of the mission
+        :return: ArchivedResults
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Archive index out of range")
+        return ArchivedResults(self, index)
+
+    def finals(self, field):
+        """
+        Final values of every mission without reading any trajectory
+        :param field: time_final, pos_final, vel_final or ke
+        :return: list with one entry per mission
+        """
+        return [mission[field] for mission in self.meta["missions"]]
@@ -0,0 +1,265 @@
+"""
+Description: The Surrogate class answers descent time, landing velocity, landing kinetic energy and drift queries for a
+mission from a precomputed table instead of a simulation, for tools that query the same mission over and over while
+the weather and mass estimates change.
+
+Details: The parameter space is the mass, the drag area Cd*S of every phase, the deployment altitude of every phase
+but the last and the initial altitude and velocity. The outcomes are tabulated on a regular grid over that space with
+the closed form solution in analytic.py, all grid points at once, and a query is a multilinear interpolation between
+the corners of its grid cell. The interpolation error of every cell is estimated from the exact solution at the cell
+center, where the multilinear interpolant is the mean of the corners. A query outside the grid, or in a cell whose
+estimated error is above the tolerance, is answered by Mission.run_analytic() for its own parameters instead, the same
+closed form as the table, so the answers do not jump at the edge of the grid. The table is saved with np.savez and
+loaded without rebuilding it.
+The drift of a query is by default the wind speed times the descent time, an upper bound that is about 7% above the
+drift Mission.display() integrates in 3D for the rocket, since the section starts without horizontal speed and lags
+behind the wind. A query with integrate=True integrates the drift in 3D like Mission.display() at the cost of a
+Descent3D run.
+"""
+import copy
+import json
+import numpy as np
+from simulator import analytic
+from simulator.chute import Parachute
+from simulator.kernels import drag_constant
+from simulator.mission import Mission
+from simulator.report import drift_rows
+from tools import tofps
+
+
+class Surrogate(object):
+    outputs = ["time", "vel", "ke"]
+
+    def __init__(self, axes, nodes, values, error, rho, ground, setup=None, tol=0.01):
+        """
+        :param axes: list of the parameter names, see names()
+        :param nodes: list of the increasing grid nodes of each parameter, a parameter with one node is held fixed
+        :param values: (*grid, 3) ndarray of the descent time, landing velocity and landing kinetic energy
+        :param error: (*cells, 3) ndarray of the estimated absolute interpolation error of each grid cell
+        :param rho: air density the table was built with
+        :param ground: altitude where the last phase ends
+        :param setup: MissionSetup used for the full simulation fallback, None to not fall back
+        :param tol: default 0.01, largest estimated relative error of a query before it falls back
+        """
+        self.axes = list(axes)
+        self.nodes = [np.asarray(x, dtype=float) for x in nodes]
+        self.values = values
+        self.error = error
+        self.rho = rho
+        self.ground = ground
+        self.setup = setup
+        self.tol = tol
+        self.n = sum(1 for name in self.axes if name.startswith("cds_"))
+        self.lo = np.array([x[0] for x in self.nodes])
+        self.hi = np.array([x[-1] for x in self.nodes])
+        self.size = np.array([len(x) for x in self.nodes])
+        self.step = np.array([(x[-1] - x[0]) / (len(x) - 1) if len(x) > 1 else 1.0 for x in self.nodes])
+        grid = self.values.shape[:-1]
+        strides = np.cumprod((grid + (1,))[::-1])[::-1][1:]
+        cells = self.error.shape[:-1]
+        cell_strides = np.cumprod((cells + (1,))[::-1])[::-1][1:]
+        # corners of a cell, an axis with one node has the same node on both sides
+        moving = self.size > 1
+        bits = (np.arange(2 ** int(moving.sum()))[:, None] >> np.arange(int(moving.sum()))) & 1
+        self.bits = np.zeros((len(bits), len(self.axes)), dtype=int)
+        self.bits[:, moving] = bits
+        self.strides = strides
+        self.cell_strides = cell_strides
+        self.flat = self.values.reshape(-1, len(self.outputs))
+        self.flat_error = self.error.reshape(-1, len(self.outputs))
+        self.fallbacks = 0
+
+    @staticmethod
+    def names(n):
+        """
+        :param n: number of phases
+        :return: list of the parameter names of a mission with n phases
+        """
+        return (["mass"] + ["cds_" + str(i + 1) for i in range(n)] + ["deploy_" + str(i + 1) for i in range(n - 1)]
+                + ["altitude", "velocity"])
+
+    @classmethod
+    def build(cls, setup, ranges=None, nodes=7, spread=0.15, tol=0.01):
+        """
+        Tabulates the outcomes of a mission around its setup
+        :param setup: MissionSetup, every phase must use the drag plus gravity model with a constant density
+        :param ranges: dict of {name: (low, high)} or {name: ndarray of nodes}, see names(). A parameter that is not
+        given spans +/- spread around the setup, except the initial velocity which is held at the setup value.
+        :param nodes: default 7, number of nodes of every parameter that is given as a range
+        :param spread: default 0.15, relative half width of the default ranges
+        :param tol: default 0.01, largest estimated relative error of a query before it falls back
+        :return: Surrogate
+        """
+        assert setup.atmosphere.constant, "The surrogate is built with a constant density atmosphere"
+        assert all(force is None for force in setup.forces), "The surrogate does not support custom force models"
+        axes = cls.names(setup.n)
+        base = cls.base(setup)
+        ranges = {} if ranges is None else ranges
+        grid = []
+        for name in axes:
+            if name in ranges:
+                span = np.asarray(ranges[name], dtype=float)
+                grid.append(np.linspace(span[0], span[1], nodes) if len(span) == 2 else span)
+            elif name == "velocity":
+                grid.append(np.array([base[name]]))
+            else:
+                grid.append(np.linspace(base[name] * (1.0 - spread), base[name] * (1.0 + spread), nodes))
+        for name, x in zip(axes, grid):
+            if len(x) > 2:
+                assert np.allclose(np.diff(x), x[1] - x[0]), "The nodes of \"{0}\" must be evenly spaced".format(name)
+        rho = setup.atmosphere.rho
+        ground = setup.bc[-1]
+        points = np.stack(np.meshgrid(*grid, indexing="ij"), axis=-1)
+        values = cls.exact(axes, points.reshape(-1, len(axes)), rho, ground).reshape(points.shape[:-1] + (3,))
+        # the interpolant at the center of a cell is the mean of its corners
+        centers = [0.5 * (x[:-1] + x[1:]) if len(x) > 1 else x for x in grid]
+        mean = values
+        for axis, x in enumerate(grid):
+            if len(x) > 1:
+                mean = 0.5 * (mean.take(np.arange(len(x) - 1), axis) + mean.take(np.arange(1, len(x)), axis))
+        points = np.stack(np.meshgrid(*centers, indexing="ij"), axis=-1)
+        exact = cls.exact(axes, points.reshape(-1, len(axes)), rho, ground).reshape(mean.shape)
+        return cls(axes, grid, values, np.abs(exact - mean), rho, ground, setup, tol)
+
+    @staticmethod
+    def base(setup):
+        """
+        :param setup: MissionSetup
+        :return: dict of the parameters of the setup
+        """
+        params = {"mass": float(setup.masses[-1]), "altitude": float(setup.initial_state[0]),
+                  "velocity": float(setup.initial_state[1])}
+        for i, chute in enumerate(setup.chutes):
+            params["cds_" + str(i + 1)] = float(chute.cd * chute.S)
+        for i in range(setup.n - 1):
+            params["deploy_" + str(i + 1)] = float(setup.bc[i])
+        return params
+
+    @staticmethod
+    def exact(axes, points, rho, ground):
+        """
+        Outcomes from the closed form solution
+        :param axes: list of the parameter names
+        :param points: (m, parameters) ndarray
+        :param rho: air density
+        :param ground: altitude where the last phase ends
+        :return: (m, 3) ndarray of the descent time, landing velocity and landing kinetic energy
+        """
+        p = dict(zip(axes, points.T))
+        n = sum(1 for name in axes if name.startswith("cds_"))
+        r, v = p["altitude"], p["velocity"]
+        time = 0.0
+        for i in range(n):
+            k = drag_constant(p["mass"], p["cds_" + str(i + 1)], 1.0, rho)
+            bc = p["deploy_" + str(i + 1)] if i < n - 1 else ground
+            t, v = analytic.phase_end(r, v, k, bc)
+            time = time + t
+            r = np.minimum(r, bc)
+        return np.column_stack([time, v, 0.5 * p["mass"] * v ** 2])
+
+    def interpolate(self, points):
+        """
+        Multilinear interpolation of the table
+        :param points: (m, parameters) ndarray
+        :return:
+            values: (m, 3) ndarray of the descent time, landing velocity and landing kinetic energy
+            error: (m, 3) ndarray of the estimated absolute error
+            inside: (m, ) bool ndarray, False for points outside the grid
+        """
+        points = np.atleast_2d(points)
+        inside = np.all((points >= self.lo) & (points <= self.hi), axis=1)
+        f = np.clip((points - self.lo) / self.step, 0.0, self.size - 1)
+        cell = np.minimum(f.astype(int), np.maximum(self.size - 2, 0))
+        w = f - cell
+        weights = np.prod(np.where(self.bits[None], w[:, None], 1.0 - w[:, None]), axis=2)
+        corners = (cell[:, None, :] + self.bits[None]) @ self.strides
+        values = np.einsum("mc,mco->mo", weights, self.flat[corners])
+        error = self.flat_error[cell @ self.cell_strides]
+        return values, error, inside
+
+    def params(self, **kwargs):
+        """
+        :param kwargs: parameters by name, the others are taken from the setup
+        :return: (parameters, ) ndarray
+        """
+        for name in kwargs:
+            assert name in self.axes, "Unknown parameter \"{0}\", options: {1}".format(name, ", ".join(self.axes))
+        base = self.base(self.setup) if self.setup is not None else {}
+        return np.array([float(kwargs[name]) if name in kwargs else base[name] for name in self.axes])
+
+    def query(self, winds=(), integrate=False, **kwargs):
+        """
+        Outcome of one set of parameters, from the table when it is inside the grid and within the tolerance and from
+        the closed form solution of Mission.run_analytic() otherwise
+        :param winds: wind speeds (mph) for the drift
+        :param integrate: default False, flag to integrate the drift in 3D like Mission.display() instead of the wind
+        speed times descent time estimate
+        :param kwargs: parameters by name, see names(), the others are taken from the setup
+        :return: dict of time, vel, ke, drift, the estimated error of each and whether it fell back to a simulation
+        """
+        point = self.params(**kwargs)
+        values, error, inside = self.interpolate(point)
+        values, error = values[0], error[0]
+        fallback = not inside[0] or bool(np.any(error > self.tol * np.abs(values)))
+        if fallback:
+            values, error = self.simulate(point), np.zeros(3)
+        result = {name: float(x) for name, x in zip(self.outputs, values)}
+        result["error"] = {name: float(x) for name, x in zip(self.outputs, error)}
+        if integrate:
+            drift = drift_rows([self.point_setup(point)], [values[0]], winds)[0]
+        else:
+            drift = tofps(np.asarray(winds, dtype=float), 'mph') * values[0]
+        result["drift"] = [float(x) for x in drift]
+        result["fallback"] = fallback
+        return result
+
+    def point_setup(self, point):
+        """
+        :param point: (parameters, ) ndarray
+        :return: MissionSetup of the setup of the surrogate with the parameters of the point
+        """
+        assert self.setup is not None, "The surrogate needs a setup to fall back to a simulation"
+        p = dict(zip(self.axes, point))
+        setup = copy.copy(self.setup)
+        setup.initial_state = np.array([p["altitude"], p["velocity"]])
+        setup.chutes = [Parachute(1.0, p["cds_" + str(i + 1)]) for i in range(self.n)]
+        setup.masses = [p["mass"]] * self.n
+        setup.bc = [p["deploy_" + str(i + 1)] for i in range(self.n - 1)] + [self.setup.bc[-1]]
+        return setup
+
+    def simulate(self, point):
+        """
+        Outcome of one set of parameters from Mission.run_analytic(), the closed form solution the table is built with
+        :param point: (parameters, ) ndarray
+        :return: (3, ) ndarray of the descent time, landing velocity and landing kinetic energy
+        """
+        self.fallbacks += 1
+        setup = self.point_setup(point)
+        mission = Mission(setup)
+        mission.run_analytic()
+        vel = mission.results.vel_final[-1]
+        return np.array([mission.results.time_final[0], vel, 0.5 * setup.masses[-1] * vel ** 2])
+
+    def save(self, path):
+        """
+        Saves the table with np.savez, the setup is not saved
+        :param path: path of the .npz file
+        :return: None
+        """
+        meta = {"axes": self.axes, "rho": self.rho, "ground": self.ground, "tol": self.tol}
+        nodes = {"nodes_" + str(i): x for i, x in enumerate(self.nodes)}
+        np.savez(path, meta=np.array(json.dumps(meta)), values=self.values, error=self.error, **nodes)
+
+    @classmethod
+    def load(cls, path, setup=None):
+        """
+        Loads a table saved with save()
+        :param path: path of the .npz file
+        :param setup: MissionSetup for the defaults of the queries and the full simulation fallback
+        :return: Surrogate
+        """
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            nodes = [data["nodes_" + str(i)] for i in range(len(meta["axes"]))]
+            return cls(meta["axes"], nodes, data["values"], data["error"], meta["rho"], meta["ground"], setup,
+                       meta["tol"])
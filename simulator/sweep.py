@@ -0,0 +1,234 @@
+"""
+Description: Parameter sweeps for parachute and mass trade studies. A sweep is a list of cases, each case a dict of
+mission parameters, that is run in chunks over a process pool and collected into one columnar table.
+
+Details: A case uses the following keys, every key but the parachutes has a default
+    drogue, main: parachute names for a two phase descent (or chutes: list of names for any number of phases)
+    deploy: main deployment altitude in ft (or bc: list of breaking altitudes)
+    mass: total mass in slugs, or a list of masses per phase, default the rocket mass of rocket_setup.py
+    split: list of section masses in slugs, the total mass is their sum and the kinetic energy is per section
+    state: initial state vector, default [4000.0, 0.0]
+    dt: time step for every phase, default 0.01
+Completed chunks are appended to an optional checkpoint file so an interrupted sweep resumes where it stopped. Each
+row of the checkpoint is stored with the key of its case, so a resumed sweep only reuses the rows of the same cases, in
+any order.
+
+Usage: python -m simulator.sweep --drogue 24 36 --main certL certXXL --deploy 500 600 700 --split 17.81,18.73
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+from multiprocessing import Pool
+import numpy as np
+from simulator.mission import Mission
+from simulator.setup import MissionSetup
+from tools import toslugs
+
+columns = ["time_final", "vel_final", "ke"]
+default_mass = toslugs(17.81 + 14.67 + 4.06, 'lb')  # total mass of rocket_setup.py
+
+
+def grid(**axes):
+    """
+    Builds every combination of the given parameter values
+    :param axes: parameter name and list of values for each axis of the grid
+    :return: list of case dicts
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*[axes[name] for name in names])]
+
+
+def case_setup(case):
+    """
+    Builds the mission setup for a case
+    :param case: dict of mission parameters
+    :return: MissionSetup
+    """
+    chutes = case["chutes"] if "chutes" in case else [case["drogue"], case["main"]]
+    n = len(chutes)
+    bc = case["bc"] if "bc" in case else [float(case.get("deploy", 600.0)), 0.0]
+    if "split" in case:
+        mass = float(np.sum(case["split"]))
+    else:
+        mass = case.get("mass", default_mass)
+    masses = list(mass) if isinstance(mass, (list, tuple)) else [mass] * n
+    dt = case.get("dt", 0.01)
+    dt = list(dt) if isinstance(dt, (list, tuple)) else [dt] * n
+    state = np.array(case.get("state", [4000.0, 0.0]), dtype=float)
+    return MissionSetup(case.get("name", "Case"), n, list(chutes), masses, list(bc), dt, state)
+
+
+def case_key(case):
+    """
+    :param case: dict of mission parameters
+    :return: str that is the same for equal cases, independent of the order of the keys
+    """
+    return json.dumps(case, sort_keys=True, default=lambda value: np.asarray(value).tolist())
+
+
+def run_case(case):
+    """
+    Runs one case of a sweep
+    :param case: dict of mission parameters
+    :return: dict of the total descent time, landing velocity and largest landing kinetic energy of any section
+    """
+    setup = case_setup(case)
+    mission = Mission(setup)
+    split = None
+    if "split" in case:
+        split = [np.asarray(case["split"], dtype=float)] * setup.n
+    mission.run_mission(split=split, record="endpoints")
+    return {"time_final": float(mission.results.time_final[0]),
+            "vel_final": float(mission.results.vel_final[-1]),
+            "ke": float(np.max(mission.results.ke[-1]))}
+
+
+def run_chunk(chunk):
+    """
+    Runs a chunk of cases in a worker process
+    :param chunk: list of (index, case) pairs
+    :return: list of (index, row) pairs
+    """
+    return [(index, run_case(case)) for index, case in chunk]
+
+
+class Sweep(object):
+    def __init__(self, cases):
+        """
+        This class runs a list of cases over a process pool. The method run() is called after initialization.
+        :param cases: list of case dicts, see grid() for building them
+        """
+        self.cases = list(cases)
+        self.table = None
+
+    def run(self, processes=None, chunksize=None, checkpoint=None):
+        """
+        Runs every case of the sweep
+        :param processes: number of worker processes, default is the number of CPUs. 1 runs in this process.
+        :param chunksize: number of cases sent to a worker at once, default splits the cases into 4 chunks per worker
+        :param checkpoint: optional path of a file that completed cases are appended to. Cases already in the file
+        are not run again.
+        :return: dict of {column: ndarray} with one row per case
+        """
+        rows = self.load_checkpoint(checkpoint)
+        keys = [case_key(case) for case in self.cases]
+        done = {i: rows[key] for i, key in enumerate(keys) if key in rows}
+        todo = [(i, case) for i, case in enumerate(self.cases) if i not in done]
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if chunksize is None:
+            chunksize = max(1, len(todo) // (4 * processes))
+        chunks = [todo[i:i + chunksize] for i in range(0, len(todo), chunksize)]
+        out = open(checkpoint, "a") if checkpoint is not None else None
+        try:
+            if processes == 1:
+                self.collect(map(run_chunk, chunks), done, out, keys)
+            else:
+                with Pool(processes) as pool:
+                    self.collect(pool.imap_unordered(run_chunk, chunks), done, out, keys)
+        finally:
+            if out is not None:
+                out.close()
+        self.table = self.make_table(done)
+        return self.table
+
+    @staticmethod
+    def collect(results, done, out, keys):
+        """
+        Stores finished chunks and appends them to the checkpoint file
+        :param results: iterable of finished chunks
+        :param done: dict of {index: row} that is updated in place
+        :param out: open checkpoint file or None
+        :param keys: list of the key of each case, see case_key()
+        :return: None
+        """
+        for chunk in results:
+            for index, row in chunk:
+                done[index] = row
+                if out is not None:
+                    out.write(json.dumps({"key": keys[index], "row": row}) + "\n")
+            if out is not None:
+                out.flush()
+
+    @staticmethod
+    def load_checkpoint(checkpoint):
+        """
+        Reads the cases that were completed by a previous run
+        :param checkpoint: path of the checkpoint file or None
+        :return: dict of {case key: row}, see case_key()
+        """
+        done = {}
+        if checkpoint is None or not os.path.exists(checkpoint):
+            return done
+        with open(checkpoint) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # the last line is cut short if the previous run was killed while writing it
+                    continue
+                if "key" in entry:
+                    done[entry["key"]] = entry["row"]
+        return done
+
+    def make_table(self, done):
+        """
+        Builds the columnar result table
+        :param done: dict of {index: row} for every case
+        :return: dict of {column: ndarray}
+        """
+        table = {"case": np.arange(len(self.cases))}
+        params = []
+        for case in self.cases:
+            params += [key for key in case if key not in params]
+        for key in params:
+            values = [case.get(key) for case in self.cases]
+            if all(np.isscalar(value) for value in values):
+                table[key] = np.array(values)
+            else:
+                table[key] = np.array([json.dumps(np.asarray(value).tolist()) for value in values])
+        for col in columns:
+            table[col] = np.array([done[i][col] for i in range(len(self.cases))])
+        return table
+
+
+def write_csv(table, path):
+    """
+    Writes a columnar table to a csv file
+    :param table: dict of {column: ndarray}
+    :param path: path of the csv file
+    :return: None
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(table))
+        writer.writerows(zip(*[table[col].tolist() for col in table]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parachute and mass trade study sweep")
+    parser.add_argument("--drogue", nargs="+", required=True, help="drogue parachute names")
+    parser.add_argument("--main", nargs="+", required=True, help="main parachute names")
+    parser.add_argument("--deploy", nargs="+", type=float, default=[600.0], help="main deployment altitudes (ft)")
+    parser.add_argument("--split", nargs="+", required=True,
+                        help="comma separated section masses (lb), one entry per mass split")
+    parser.add_argument("--altitude", type=float, default=4000.0, help="apogee altitude (ft)")
+    parser.add_argument("--dt", type=float, default=0.01, help="time step (s)")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=None, help="cases per task sent to a worker")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file to resume from")
+    parser.add_argument("--out", default="sweep.csv", help="output csv file")
+    args = parser.parse_args(argv)
+
+    splits = [[toslugs(float(m), 'lb') for m in split.split(",")] for split in args.split]
+    cases = grid(drogue=args.drogue, main=args.main, deploy=args.deploy, split=splits,
+                 state=[[args.altitude, 0.0]], dt=[args.dt])
+    table = Sweep(cases).run(args.processes, args.chunksize, args.checkpoint)
+    write_csv(table, args.out)
+    print("{0} cases written to {1}".format(len(cases), args.out))
+
+
+if __name__ == "__main__":
+    main()
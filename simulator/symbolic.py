@@ -0,0 +1,32 @@
+"""
+Description: Symbolic derivation of the equations of motion. This is the optional path for custom force models that
+are easier to write out with sympy than by hand. The default drag plus gravity model lives in kernels.py and does not
+need sympy at all.
+"""
+import sympy as sy
+from simulator.kernels import g, rho
+
+
+def make_equ(mass, area, c_d, force=None, rho=rho):
+    """
+    Using symbolics to derive the equations of motion for each falling section with a given mass, area, and
+    coefficient of drag
+    :param mass: mass of the falling section
+    :param area: reference area of the parachute
+    :param c_d: drag coefficient of the parachute
+    :param force: optional function of the sympy symbols (r_y, v_y) returning an extra acceleration term
+    :param rho: air density
+    :return: function that will input a ndarray state vector and return the time derivative
+    """
+    r_y, v_y = sy.symbols("r_y, v_y")
+    d_r_y = v_y
+
+    d_v_drag = (c_d * 0.5 * rho * area * v_y ** 2) / mass
+    d_v_y = d_v_drag - g
+    if force is not None:
+        d_v_y = d_v_y + force(r_y, v_y)
+
+    var = [r_y, v_y]
+    equs = sy.Matrix([d_r_y, d_v_y])
+    l_equ = sy.lambdify([var], equs)
+    return l_equ
@@ -0,0 +1,83 @@
+"""
+Description: Wind profiles for the multi-dimensional descent. A WindProfile is a tabulated horizontal wind against
+altitude and a WindTable stacks many profiles into one lookup table that is evaluated for a whole ensemble at once.
+
+Details: The tabulated profile is resampled once onto a uniform altitude grid when the table is built, so looking up the
+wind during integration is an index computation and one linear blend per row instead of a search through the tabulated
+altitudes. Above and below the tabulated altitudes the wind is held at the closest tabulated value.
+"""
+import numpy as np
+from tools import tofps
+
+
+class WindProfile(object):
+    def __init__(self, altitudes, wind):
+        """
+        :param altitudes: ndarray of altitudes (ft) in increasing order
+        :param wind: ndarray of wind speeds (ft/s) along x, or (n, 2) ndarray of x and y wind components
+        """
+        altitudes = np.asarray(altitudes, dtype=float).flatten()
+        wind = np.asarray(wind, dtype=float)
+        if wind.ndim == 1:
+            wind = np.column_stack((wind, np.zeros_like(wind)))
+        assert wind.shape == (len(altitudes), 2), "\"wind\" must have one speed or (x, y) pair per altitude"
+        assert np.all(np.diff(altitudes) > 0.0), "\"altitudes\" must be increasing"
+        self.altitudes = altitudes
+        self.wind = wind
+
+    @classmethod
+    def uniform(cls, speed, units='mph', heading=0.0):
+        """
+        Wind with the same speed at every altitude
+        :param speed: wind speed
+        :param units: units of the wind speed, see tools.tofps
+        :param heading: direction the wind blows toward, in degrees from the x axis
+        :return: WindProfile
+        """
+        speed = tofps(speed, units)
+        angle = np.radians(heading)
+        return cls([0.0, 1.0], [[speed * np.cos(angle), speed * np.sin(angle)]] * 2)
+
+
+class WindTable(object):
+    def __init__(self, profiles, dz=5.0):
+        """
+        Resamples a list of wind profiles onto a common uniform altitude grid
+        :param profiles: list of WindProfile
+        :param dz: altitude spacing of the lookup table (ft)
+        """
+        low = min(profile.altitudes[0] for profile in profiles)
+        high = max(profile.altitudes[-1] for profile in profiles)
+        n = max(int(np.ceil((high - low) / dz)), 1) + 1
+        self.z0 = low
+        self.dz = dz
+        self.inv_dz = 1.0 / dz
+        grid = low + dz * np.arange(n + 1)
+        self.table = np.empty((len(profiles), n + 1, 2))
+        for i, profile in enumerate(profiles):
+            for j in range(2):
+                self.table[i, :, j] = np.interp(grid, profile.altitudes, profile.wind[:, j])
+        self.n = n
+        self.flat = np.zeros((self.table.shape[0] * (n + 1), 3))
+        self.flat[:, :2] = self.table.reshape((-1, 2))
+
+    def offset(self, idx):
+        """
+        Offset of each row into the flattened lookup table
+        :param idx: (m, ) ndarray of the profile of each row
+        :return: (m, ) ndarray of offsets
+        """
+        return idx * (self.n + 1)
+
+    def lookup(self, base, z):
+        """
+        Wind for a set of rows of the ensemble
+        :param base: (m, ) ndarray of the offset of each row, see offset()
+        :param z: (m, ) ndarray of the altitude of each row
+        :return: (m, 3) ndarray of x, y and z wind components, the vertical wind is always zero
+        """
+        f = np.clip((z - self.z0) * self.inv_dz, 0.0, self.n)
+        i = np.minimum(f.astype(int), self.n - 1)
+        w = (f - i)[:, None]
+        i += base
+        return self.flat[i] * (1.0 - w) + self.flat[i + 1] * w
@@ -0,0 +1,48 @@
+"""
+Cross-checks of the numerical integrators against the closed form solution of analytic.py
+"""
+import copy
+import numpy as np
+import pytest
+from simulator.mission import Mission
+from setup_files.rocket_post_build_space_jam import rocket_setup, payload_setup
+
+setups = [rocket_setup, payload_setup]
+
+
+def run(setup, integrator, tol=1e-10):
+    setup = copy.copy(setup)
+    setup.integrator = [integrator] * setup.n
+    setup.rtol = setup.atol = tol
+    mission = Mission(setup)
+    mission.run_mission(record="endpoints")
+    return mission.results
+
+
+@pytest.mark.parametrize("setup", setups, ids=lambda s: s.title)
+def test_dp45_matches_analytic(setup):
+    mission = Mission(setup)
+    mission.run_analytic()
+    exact = mission.results
+    res = run(setup, "dp45")
+    np.testing.assert_allclose(res.time_final, exact.time_final, rtol=0.0, atol=1e-8)
+    np.testing.assert_allclose(res.vel_final, exact.vel_final, rtol=1e-8)
+    np.testing.assert_allclose(res.pos_final, exact.pos_final, rtol=0.0, atol=1e-8)
+
+
+@pytest.mark.parametrize("setup", setups, ids=lambda s: s.title)
+def test_rk4_matches_analytic_within_a_step(setup):
+    mission = Mission(setup)
+    mission.run_analytic()
+    exact = mission.results
+    res = run(setup, "rk4")
+    dt = np.asarray(setup.dt)
+    speed = np.abs(exact.vel_final)
+    # a fixed step phase ends on the first step past its breaking altitude, so it overshoots by at most one step, and
+    # the next phase starts lower by that overshoot, which it covers at its own speed
+    overshoot = speed * dt
+    bound = dt + np.concatenate(([0.0], overshoot[:-1] / speed[1:]))
+    assert np.all(np.abs(np.asarray(res.time_final[1:]) - exact.time_final[1:]) <= bound)
+    assert abs(res.time_final[0] - exact.time_final[0]) <= bound.sum()
+    np.testing.assert_allclose(res.vel_final, exact.vel_final, rtol=1e-6)
+    assert np.all(np.abs(np.asarray(res.pos_final) - exact.pos_final) <= overshoot)
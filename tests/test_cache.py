@@ -0,0 +1,75 @@
+"""
+Checks of the LRU caches of cache.py and of the phases Missions share through them
+"""
+import numpy as np
+import pytest
+from simulator import cache
+from simulator.cache import LRUCache
+from simulator.instrument import Instrument
+from simulator.mission import Mission
+from setup_files.rocket_post_build_space_jam import rocket_setup
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.phases.clear()
+    yield
+    cache.phases.clear()
+
+
+def test_lru_evicts_by_count_and_bytes():
+    lru = LRUCache(3, maxbytes=100, maxentry=60)
+    assert lru.fits(60) and not lru.fits(61)
+    lru.put("a", 1, 40)
+    lru.put("b", 2, 40)
+    assert lru.get("a") == 1
+    # 120 bytes, the least recently used entry goes
+    lru.put("c", 3, 40)
+    assert lru.get("b") is None and lru.get("a") == 1 and lru.nbytes == 80
+    # too large for one entry, not cached and nothing evicted
+    lru.put("d", 4, 61)
+    assert lru.get("d") is None and lru.stats()["size"] == 2
+    # replacing an entry replaces its size
+    lru.put("a", 5, 10)
+    assert lru.nbytes == 50 and lru.get("a") == 5
+    lru.put("e", 6, 0)
+    lru.put("f", 7, 0)
+    assert lru.stats()["size"] == 3 and lru.evictions == 2
+    lru.clear()
+    assert lru.nbytes == 0 and lru.stats()["size"] == 0
+
+
+def test_missions_share_phases():
+    first = Mission(rocket_setup)
+    first.run_mission()
+    instrument = Instrument()
+    second = Mission(rocket_setup, instrument=instrument)
+    second.run_mission()
+    assert second.recomputed == [] and [r["cached"] for r in instrument.records] == [True, True]
+    assert cache.phases.stats()["hits"] == 2
+    reference = Mission(rocket_setup, use_cache=False)
+    reference.run_mission()
+    for mission in (first, second):
+        assert np.array_equal(mission.results.path[0], reference.results.path[0])
+        assert np.array_equal(mission.results.time[0], reference.results.time[0])
+
+
+def test_large_phases_are_not_cached(monkeypatch):
+    monkeypatch.setattr(cache.phases, "maxentry", 1024)
+    Mission(rocket_setup).run_mission(record="endpoints")
+    assert cache.phases.stats()["size"] == 2
+    Mission(rocket_setup).run_mission()
+    assert cache.phases.stats()["size"] == 2
+    second = Mission(rocket_setup)
+    second.run_mission()
+    assert second.recomputed == [0, 1]
+
+
+def test_phase_cache_stays_within_its_bytes(monkeypatch):
+    Mission(rocket_setup).run_mission()
+    size = cache.phases.nbytes
+    monkeypatch.setattr(cache.phases, "maxbytes", size)
+    mission = Mission(rocket_setup)
+    mission.set_phase(0, mass=1.5)
+    mission.run_mission()
+    assert cache.phases.nbytes <= size and cache.phases.evictions > 0
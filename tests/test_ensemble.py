@@ -0,0 +1,29 @@
+"""
+Checks of the batch engines against the Mission class
+"""
+import copy
+import numpy as np
+import pytest
+from simulator.ensemble import Ensemble
+from simulator.mission import Mission
+from simulator.sections import Sections
+from setup_files.rocket_post_build_space_jam import rocket_setup, payload_setup
+
+
+def test_ensemble_matches_mission():
+    results = Ensemble([rocket_setup, payload_setup]).run(record=False)
+    for j, setup in enumerate([rocket_setup, payload_setup]):
+        mission = Mission(setup, use_cache=False)
+        mission.run_mission(record="endpoints")
+        np.testing.assert_allclose(results.time_final[j], mission.results.time_final, rtol=0.0, atol=1e-9)
+        np.testing.assert_allclose(results.vel_final[j], mission.results.vel_final, rtol=1e-12)
+
+
+@pytest.mark.parametrize("field, value", [("forces", [lambda r, v: -5.0, None]), ("integrator", ["dp45", "rk4"])])
+def test_batch_engines_reject_unsupported_setups(field, value):
+    setup = copy.copy(rocket_setup)
+    setattr(setup, field, value)
+    with pytest.raises(AssertionError):
+        Ensemble([rocket_setup, setup])
+    with pytest.raises(AssertionError):
+        Sections([setup], [{"Rocket": setup.masses[0]}])
@@ -0,0 +1,18 @@
+"""
+Import regression checks of the simulation core, each in a fresh interpreter
+"""
+import json
+import subprocess
+import sys
+from benchmarks.suite import check_import, core_modules, heavy_modules, root
+
+
+def test_core_does_not_import_heavy_modules():
+    code = "import json, sys; import {0}; print(json.dumps([m for m in {1} if m in sys.modules]))".format(
+        ", ".join(core_modules), heavy_modules)
+    assert json.loads(subprocess.check_output([sys.executable, "-c", code], cwd=root)) == []
+
+
+def test_core_import_time():
+    # the fastest of 5 imports, on top of a bare import of numpy
+    assert check_import(0.1)
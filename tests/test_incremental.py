@@ -0,0 +1,82 @@
+"""
+Checks that the phases Mission reuses after set_phase() give the same trajectory as a fresh run
+"""
+import copy
+import numpy as np
+import pytest
+from setup_files.mission_chutes import parachutes
+from simulator import cache
+from simulator.mission import Mission
+from setup_files.rocket_post_build_space_jam import rocket_setup
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.phases.clear()
+    yield
+    cache.phases.clear()
+
+
+def fresh(setup, record=1):
+    mission = Mission(setup, use_cache=False)
+    mission.run_mission(record=record)
+    return mission
+
+
+def changed(phase, field, value):
+    setup = copy.copy(rocket_setup)
+    setup.chutes, setup.masses = list(setup.chutes), list(setup.masses)
+    setup.dt, setup.bc = list(setup.dt), list(setup.bc)
+    getattr(setup, field)[phase] = parachutes[value] if field == "chutes" else value
+    return setup
+
+
+def assert_same(mission, reference):
+    assert np.array_equal(mission.results.path[0], reference.results.path[0])
+    assert np.array_equal(mission.results.time[0], reference.results.time[0])
+    assert np.array_equal(mission.results.vel_final, reference.results.vel_final)
+
+
+@pytest.mark.parametrize("phase", [0, 1])
+@pytest.mark.parametrize("name, field, value", [("chute", "chutes", "certL"), ("mass", "masses", 1.5),
+                                                ("dt", "dt", 0.02), ("bc", "bc", 700.0)])
+def test_set_phase_matches_fresh_run(phase, name, field, value):
+    if name == "bc" and phase == 1:
+        value = 100.0
+    mission = Mission(rocket_setup)
+    mission.run_mission()
+    assert mission.recomputed == [0, 1]
+    mission.set_phase(phase, **{name: value})
+    mission.run_mission()
+    # the phases before the changed one are reused, the changed phase and the ones after it are integrated again
+    assert mission.recomputed == list(range(phase, rocket_setup.n))
+    assert_same(mission, fresh(changed(phase, field, value)))
+    # the setup given to the class is not modified
+    assert rocket_setup.bc == [600.0, 0.0] and rocket_setup.dt == [0.01, 0.01]
+
+
+def test_unchanged_run_reuses_every_phase():
+    mission = Mission(rocket_setup)
+    mission.run_mission()
+    mission.run_mission()
+    assert mission.recomputed == []
+    assert_same(mission, fresh(rocket_setup))
+
+
+@pytest.mark.parametrize("record", [2, "endpoints"])
+def test_record_change_integrates_again(record):
+    mission = Mission(rocket_setup)
+    mission.run_mission()
+    mission.run_mission(record=record)
+    assert mission.recomputed == [0, 1]
+    assert_same(mission, fresh(rocket_setup, record))
+    mission.run_mission()
+    assert_same(mission, fresh(rocket_setup))
+
+
+def test_no_reuse_without_cache():
+    mission = Mission(rocket_setup, use_cache=False)
+    mission.run_mission()
+    mission.set_phase(1, chute="certL")
+    mission.run_mission()
+    assert mission.recomputed == [0, 1]
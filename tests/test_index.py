@@ -0,0 +1,42 @@
+"""
+Checks the number of points of the min/max decimation of TrajectoryIndex
+"""
+import numpy as np
+import pytest
+from simulator import cache
+from simulator.index import TrajectoryIndex
+from simulator.mission import Mission
+from setup_files.rocket_post_build_space_jam import rocket_setup
+
+
+@pytest.fixture(scope="module")
+def index():
+    cache.phases.clear()
+    mission = Mission(rocket_setup, use_cache=False)
+    mission.run_mission()
+    cache.phases.clear()
+    return mission.results.index()
+
+
+@pytest.mark.parametrize("points", [1, 2, 3, 4, 5, 9, 100, 2000])
+def test_lod_point_cap(index, points):
+    time, values = index.lod(points=points)
+    assert 1 <= len(time) <= points
+    assert len(values) == len(time)
+    assert np.all(np.diff(time) > 0.0)
+
+
+def test_lod_keeps_peaks(index):
+    time, values = index.lod(column=1, points=200)
+    assert values.min() == index.state[:, 1].min()
+    assert values.max() == index.state[:, 1].max()
+    assert time[0] == index.time[0] and time[-1] == index.time[-1]
+
+
+@pytest.mark.parametrize("points", [1, 2, 3])
+def test_lod_empty_pyramid(points):
+    index = TrajectoryIndex(np.arange(4.0), np.array([[4.0, 0.0], [3.0, -1.0], [2.0, -2.0], [1.0, -3.0]]))
+    assert index.levels == []
+    time, values = index.lod(points=points)
+    assert len(time) == points
+    assert time[0] == 0.0
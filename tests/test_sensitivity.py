@@ -0,0 +1,43 @@
+"""
+Cross-checks of the forward sensitivities of Mission.run_sensitivity() against central differences of the closed form
+solution of analytic.py
+"""
+import numpy as np
+import pytest
+from simulator.chute import Parachute
+from simulator.mission import Mission
+from setup_files.rocket_post_build_space_jam import rocket_setup
+
+params = ["cd", "S", "mass", "bc"]
+
+
+@pytest.fixture(scope="module")
+def sensitivity():
+    return Mission(rocket_setup, use_cache=False).run_sensitivity(record="endpoints")
+
+
+def analytic(phase, name, x):
+    mission = Mission(rocket_setup, use_cache=False)
+    chute = rocket_setup.chutes[phase]
+    change = {"cd": {"chute": Parachute(x, chute.S)}, "S": {"chute": Parachute(chute.cd, x)}, "mass": {"mass": x},
+              "bc": {"bc": x}}[name]
+    mission.set_phase(phase, **change)
+    mission.run_analytic()
+    res = mission.results
+    return np.array(res.time_final), np.array(res.vel_final), np.ravel(res.ke)
+
+
+@pytest.mark.parametrize("phase", range(rocket_setup.n))
+@pytest.mark.parametrize("name", params)
+def test_sensitivity_matches_central_differences(sensitivity, phase, name):
+    chute = rocket_setup.chutes[phase]
+    x = {"cd": chute.cd, "S": chute.S, "mass": rocket_setup.masses[phase], "bc": rocket_setup.bc[phase]}[name]
+    h = 1e-5 * max(abs(x), 1.0)
+    plus, minus = analytic(phase, name, x + h), analytic(phase, name, x - h)
+    d_time, d_vel, d_ke = [(p - m) / (2.0 * h) for p, m in zip(plus, minus)]
+    j = params.index(name)
+    dt = max(rocket_setup.dt)
+    # the times of the rk4 run are within a step of the closed form, so are their derivatives relative to their size
+    np.testing.assert_allclose(sensitivity.time_final[:, j, phase], d_time, rtol=dt, atol=dt)
+    np.testing.assert_allclose(sensitivity.vel_final[:, j, phase], d_vel, rtol=1e-8, atol=1e-8)
+    np.testing.assert_allclose(sensitivity.ke[:, j, phase], d_ke, rtol=1e-8, atol=1e-8)
@@ -0,0 +1,79 @@
+"""
+Checks of the descent query service, run without a server through Service.respond()
+"""
+import asyncio
+import json
+import pytest
+from simulator import service
+from simulator.service import Service
+from tools import tofps
+
+valid = {"drogue": "24", "main": "certXXL", "winds": []}
+
+
+def answer(*queries, **options):
+    async def run():
+        svc = Service(**options)
+        svc.queue = asyncio.Queue()
+        batcher = asyncio.ensure_future(svc.batcher())
+        try:
+            return await asyncio.gather(*[svc.respond("POST", "/query", json.dumps(q).encode()) for q in queries])
+        finally:
+            batcher.cancel()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("bad", [{"winds": 5}, {"winds": ["x"]}, {"dec": "x"}, {"bc": [600.0]}, {"dt": 0},
+                                 {"state": [4000.0, 5.0]}, {"mass": -1.0}])
+def test_bad_query_does_not_fail_the_batch(bad):
+    ok, error = answer(valid, dict(valid, **bad))
+    assert ok[0] == 200 and ok[1]["time"][0] == 76.75
+    assert error[0] == 400
+
+
+def test_failure_in_a_batch_only_fails_its_query(monkeypatch):
+    evaluate = service.evaluate
+
+    def failing(cases, setups, *args):
+        if any(case.get("name") == "bad" for case in cases):
+            raise ValueError("bad query")
+        return evaluate(cases, setups, *args)
+    monkeypatch.setattr(service, "evaluate", failing)
+    ok, error, other = answer(valid, dict(valid, name="bad"), dict(valid, deploy=700.0))
+    assert ok[0] == 200 and other[0] == 200
+    assert error == (400, {"error": "ValueError: bad query"})
+
+
+def test_drift_models():
+    winds = {"drogue": "24", "main": "certXXL", "winds": [5]}
+    (_, exact), (_, estimate) = answer(winds, dict(winds, drift="estimate"))
+    # the 3D drift of Mission.display() and wind speed times descent time
+    assert exact["drift"] == [522.63] and exact["drift_model"] == "3d"
+    assert estimate["drift"] == [round(tofps(5, 'mph') * 76.75, 2)] and estimate["drift_model"] == "estimate"
+    (_, coarse), = answer(winds, drift_dt=0.05)
+    assert abs(coarse["drift"][0] - 522.63) < 2.0
+    (_, default), = answer(winds, drift="estimate")
+    assert default == estimate
+
+
+def test_drift_cache_is_shared_by_queries_of_the_same_setup():
+    async def run():
+        svc = Service()
+        svc.queue = asyncio.Queue()
+        batcher = asyncio.ensure_future(svc.batcher())
+        try:
+            first = await svc.query({"drogue": "24", "main": "certXXL", "winds": [5], "split": [0.55, 0.58]})
+            second = await svc.query({"drogue": "24", "main": "certXXL", "winds": [5], "split": [0.5, 0.63]})
+            return first, second, svc.drift_cache.stats()
+        finally:
+            batcher.cancel()
+    first, second, stats = asyncio.run(run())
+    assert first["drift"] == second["drift"] and first["ke"] != second["ke"]
+    assert stats["hits"] == 1 and stats["size"] == 1
+
+
+def test_small_and_large_batches_agree(monkeypatch):
+    queries = [{"drogue": d, "main": m, "deploy": 550.0, "winds": []} for d in ("24", "36") for m in ("certL", "certXXL")]
+    small = answer(*queries)
+    monkeypatch.setattr(service, "mission_batch", 0)
+    assert answer(*queries) == small
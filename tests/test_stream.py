@@ -0,0 +1,27 @@
+"""
+Checks that the chunks of Mission.stream() are the trajectory run_mission() writes into its buffer
+"""
+import numpy as np
+import pytest
+from simulator import cache
+from simulator.mission import Mission
+from setup_files.rocket_post_build_space_jam import rocket_setup
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.phases.clear()
+    yield
+    cache.phases.clear()
+
+
+@pytest.mark.parametrize("record", [1, 7, "endpoints"])
+def test_stream_matches_run(record):
+    mission = Mission(rocket_setup, use_cache=False)
+    mission.run_mission(record=record)
+    chunks = list(Mission(rocket_setup, use_cache=False).stream(chunk=100, record=record))
+    time = np.concatenate([time for _, time, _ in chunks])
+    path = np.vstack([results for _, _, results in chunks])
+    assert np.array_equal(time, mission.results.time[0])
+    assert np.array_equal(path, mission.results.path[0])
+
@@ -16,3 +16,13 @@ def tofeet(x, u):
         return x * cnst[u]
     except KeyError:
         raise Exception("Unrecognized units (tofeet)")
+
+
+def tofps(x, u):
+    """Convert to feet per second"""
+    cnst = {'mph': 1.466667,
+            'kts': 1.687810}
+    try:
+        return x * cnst[u]
+    except KeyError:
+        raise Exception("Unrecognized units (tofps)")